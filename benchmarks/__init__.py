@@ -0,0 +1,2 @@
+# benchmarks — замеры производительности без сервера Streamlit:
+#   python -m benchmarks --copies 8 --lines 10,100,1000,10000 -o bench.json --baseline bench_prev.json
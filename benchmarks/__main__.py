@@ -0,0 +1,178 @@
+# benchmarks/__main__.py
+# Замер этапов на синтетическом каталоге: чтение каталога, ячейки матрицы, расчёт
+# спецификации, подбор кронштейнов и выгрузка в Excel. Результаты — JSON; с --baseline
+# сравниваются с прежним прогоном, код возврата 1 при замедлении больше --threshold
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.synthetic import random_entries, write_catalog
+from radiatool.brackets import read_bracket_rules
+from radiatool.catalog import build_catalog, load_catalog, matrix_frame, read_catalog
+from radiatool.export import save_excel_spec
+from radiatool.spec import BRACKET_MODES, NO_BRACKETS, SpecCache, _aggregate_brackets, _bracket_contributions, _radiator_lines, build_spec
+
+DEFAULT_LINES = "10,100,1000,10000"
+
+
+def timed(fn, repeat):
+    # -> (медиана, минимум, результат последнего вызова)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), min(times), result
+
+
+def result_row(stage, lines, median, best, repeat, **extra):
+    return {"stage": stage, "lines": lines, "median_s": round(median, 6), "min_s": round(best, 6), "repeat": repeat, **extra}
+
+
+def bench_catalog(paths, repeat, cache_dir):
+    matrix_path, brackets_path, rules_path = paths
+    rows = []
+    median, best, _ = timed(lambda: read_catalog(matrix_path, brackets_path), max(1, repeat // 2))
+    rows.append(result_row("read_catalog", None, median, best, max(1, repeat // 2)))
+    # Первый вызов собирает артефакт, дальше — чтение скомпилированного каталога
+    load_catalog(matrix_path, brackets_path, cache_dir)
+    median, best, (sheets, brackets_df) = timed(lambda: load_catalog(matrix_path, brackets_path, cache_dir), repeat)
+    rows.append(result_row("load_catalog", None, median, best, repeat))
+    rules = read_bracket_rules(rules_path)
+    median, best, catalog = timed(lambda: build_catalog(sheets, brackets_df, rules), repeat)
+    rows.append(result_row("build_catalog", None, median, best, repeat, sheets=len(catalog.grid_index), products=len(catalog.articles)))
+    return catalog, rows
+
+
+def bench_entries(catalog, lines, repeat, seed):
+    entries = random_entries(catalog, lines, seed)
+    lines = len(entries)
+    rows = []
+
+    def all_frames():
+        for sheet_name, sheet_grid in catalog.grid_index.items():
+            matrix_frame(sheet_grid, entries, sheet_name)
+    median, best, _ = timed(all_frames, repeat)
+    n = len(catalog.grid_index)
+    rows.append(result_row("matrix_frame", lines, median / n, best / n, repeat, note="на один лист"))
+
+    median, best, df = timed(lambda: build_spec(entries, catalog), repeat)
+    rows.append(result_row("build_spec", lines, median, best, repeat, spec_rows=len(df)))
+
+    # Правка одной ячейки при уже посчитанной спецификации, как в приложении: промах result()
+    # по ключу и пересчёт в SpecCache только этой ячейки. Значения не повторяются, иначе
+    # сработал бы кэш готовых результатов
+    cache = SpecCache()
+    cache.result(entries, catalog)
+    edited = dict(entries)
+    key = next(iter(edited))
+    values = itertools.count(2)
+    def edit_one():
+        edited[key] = str(next(values))
+        return cache.result(edited, catalog)
+    median, best, _ = timed(edit_one, repeat)
+    rows.append(result_row("spec_cache_edit", lines, median, best, repeat))
+
+    # Кронштейны так, как их считает build_spec: join строк радиаторов с таблицей правил
+    # и сводка по артикулам, для каждого режима крепления
+    radiators, rad_types, _ = _radiator_lines(entries, catalog, 0.0)
+    for name, mode in BRACKET_MODES.items():
+        if mode == NO_BRACKETS or radiators is None:
+            continue
+        def brackets():
+            contrib = _bracket_contributions(radiators, rad_types, catalog, 0.0, mode)
+            return _aggregate_brackets(contrib, catalog, 0.0)
+        median, best, _ = timed(brackets, repeat)
+        rows.append(result_row(f"brackets_{name}", lines, median, best, repeat))
+
+    median, best, data = timed(lambda: save_excel_spec(df, catalog), max(1, repeat // 2))
+    rows.append(result_row("save_excel_spec", lines, median, best, max(1, repeat // 2), bytes=len(data)))
+    return rows
+
+
+def compare(results, baseline, threshold, min_time):
+    # Таблица сравнения с прежним прогоном по (этап, строк); регрессия — медиана выросла
+    # больше чем в threshold раз (этапы быстрее min_time секунд не учитываются — это шум)
+    old = {(r["stage"], r["lines"]): r for r in baseline["results"]}
+    rows = []
+    for r in results:
+        prev = old.get((r["stage"], r["lines"]))
+        if prev is None:
+            continue
+        ratio = r["median_s"] / prev["median_s"] if prev["median_s"] else float("inf")
+        slower = ratio > threshold and max(r["median_s"], prev["median_s"]) >= min_time
+        rows.append({"stage": r["stage"], "lines": r["lines"], "baseline_s": prev["median_s"],
+                     "median_s": r["median_s"], "ratio": round(ratio, 2), "regression": slower})
+    columns = ["stage", "lines", "baseline_s", "median_s", "ratio", "regression"]
+    return pd.DataFrame(rows, columns=columns).astype({"lines": "Int64"})
+
+
+def run(copies=1, extra_heights=0, extra_lengths=0, lines=(10, 100, 1000, 10000), repeat=5, seed=0, data_dir=None):
+    with tempfile.TemporaryDirectory(prefix="radiatool-bench-") as tmp:
+        data_dir = Path(data_dir) if data_dir else Path(tmp)
+        start = time.perf_counter()
+        paths = write_catalog(data_dir, copies, extra_heights, extra_lengths, seed=seed)
+        generate_s = time.perf_counter() - start
+        catalog, results = bench_catalog(paths, repeat, Path(tmp) / ".catalog")
+        for n in lines:
+            results.extend(bench_entries(catalog, n, repeat, seed))
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "copies": copies, "extra_heights": extra_heights, "extra_lengths": extra_lengths,
+            "products": len(catalog.articles), "seed": seed, "generate_s": round(generate_s, 3),
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Замеры производительности RadiaTool")
+    parser.add_argument("--copies", type=int, default=8, help="сколько раз повторить набор листов (8 — около 11 тыс. позиций)")
+    parser.add_argument("--extra-heights", type=int, default=0, help="высот сверх стандартных 300–900")
+    parser.add_argument("--extra-lengths", type=int, default=0, help="длин сверх стандартных 400–2000")
+    parser.add_argument("--lines", default=DEFAULT_LINES, help="размеры entry_values через запятую")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов каждого замера")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", type=Path, help="сохранить синтетический каталог в эту папку")
+    parser.add_argument("-o", "--output", type=Path, help="куда записать результаты (JSON)")
+    parser.add_argument("--baseline", type=Path, help="прежние результаты для сравнения")
+    parser.add_argument("--threshold", type=float, default=1.25, help="допустимое замедление, раз")
+    parser.add_argument("--min-time", type=float, default=0.001, help="этапы быстрее стольких секунд не сравниваются")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.copies, args.extra_heights, args.extra_lengths,
+        [int(n) for n in args.lines.split(",") if n.strip()], args.repeat, args.seed, args.data,
+    )
+    table = pd.DataFrame(report["results"]).astype({"lines": "Int64"})
+    print(table[["stage", "lines", "median_s", "min_s"]].to_string(index=False))
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        scale = ("copies", "extra_heights", "extra_lengths", "products")
+        if any(baseline["meta"].get(k) != report["meta"][k] for k in scale):
+            print("Внимание: базовый прогон сделан на каталоге другого размера", file=sys.stderr)
+        diff = compare(report["results"], baseline, args.threshold, args.min_time)
+        print()
+        print(diff.to_string(index=False))
+        if diff["regression"].any():
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# benchmarks/synthetic.py
+# Синтетические файлы каталога в формате data/ (Матрица.xlsx, Кронштейны.xlsx, bracket_rules.json)
+# и наборы entry_values заданного размера
+import random
+from pathlib import Path
+
+from radiatool.brackets import BRACKET_RULES_PATH, read_bracket_rules
+from radiatool.catalog import BRACKETS_PATH, BRACKETS_SHEET, MATRIX_HEIGHTS, MATRIX_LENGTHS, MATRIX_PATH
+
+MATRIX_HEADERS = ["Артикул", "Наименование", "Цена, руб", "Мощность, Вт", "Кол-во", "Вес, кг", "Объем, м3"]
+BRACKET_HEADERS = ["Артикул", "Наименование", "Цена, руб", "Тип монтажа"]
+# Листы реального каталога: подключение -> типы
+CONNECTIONS = {
+    "VK-правое": ["10", "11", "20", "21", "22", "30", "33"],
+    "VK-левое": ["10", "11", "30", "33"],
+    "K-боковое": ["10", "11", "20", "21", "22", "30", "33"],
+}
+PROFILES = {"VK-правое": ("VK-Profil", " ra"), "VK-левое": ("VK-Profil", " la"), "K-боковое": ("K-Profil", "")}
+
+
+def sheet_layout(copies=1, extra_heights=0, extra_lengths=0):
+    # Листы, высоты и длины каталога. copies > 1 добавляет серии "VK-правое-2 22" и т.д.,
+    # extra_* — высоты 1000, 1100, … и длины 2100, 2200, … сверх стандартной сетки
+    sheets = []
+    for copy in range(1, copies + 1):
+        for connection, types in CONNECTIONS.items():
+            prefix = connection if copy == 1 else f"{connection}-{copy}"
+            sheets.extend((f"{prefix} {t}", connection, t) for t in types)
+    heights = MATRIX_HEIGHTS + [1000 + 100 * i for i in range(extra_heights)]
+    lengths = MATRIX_LENGTHS + [2100 + 100 * i for i in range(extra_lengths)]
+    return sheets, heights, lengths
+
+
+def bracket_articles(rules):
+    arts = []
+    for rule in rules:
+        arts.extend([rule["article"]] if rule["articles"] is None else rule["articles"].values())
+    return list(dict.fromkeys(arts))
+
+
+def write_catalog(out_dir, copies=1, extra_heights=0, extra_lengths=0, rules_path=BRACKET_RULES_PATH, seed=0):
+    # -> пути (Матрица.xlsx, Кронштейны.xlsx, bracket_rules.json) в out_dir
+    from openpyxl import Workbook
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rnd = random.Random(seed)
+    rules_text = Path(rules_path).read_text(encoding="utf-8")
+    rules = read_bracket_rules(rules_path)
+    brackets = [
+        (art, f"Кронштейн {art} (упаковка по 10 шт./кор.)", round(rnd.uniform(150, 900), 2), "настенный")
+        for art in bracket_articles(rules)
+    ]
+
+    sheets, heights, lengths = sheet_layout(copies, extra_heights, extra_lengths)
+    wb = Workbook(write_only=True)
+    for sheet_no, (sheet, connection, rad_type) in enumerate(sheets):
+        ws = wb.create_sheet(sheet)
+        ws.append(MATRIX_HEADERS)
+        profile, suffix = PROFILES[connection]
+        for h in heights:
+            for l in lengths:
+                area = h * l / 1e6
+                ws.append([
+                    int(f"9{sheet_no:04d}{h:04d}{l:04d}"),
+                    f"Радиатор METEOR Classic {profile} {rad_type}/{h}/{l}{suffix}",
+                    round(2000 + 9000 * area * rnd.uniform(0.9, 1.1), 3),
+                    round(1800 * area * int(rad_type[0]), 1),
+                    0,
+                    round(30 * area, 2),
+                    round(0.1 * area * int(rad_type[0]), 5),
+                ])
+    ws = wb.create_sheet(BRACKETS_SHEET)
+    ws.append(BRACKET_HEADERS)
+    for row in brackets:
+        ws.append(list(row))
+    matrix_path = out_dir / MATRIX_PATH.name
+    wb.save(matrix_path)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(BRACKETS_SHEET)
+    ws.append(BRACKET_HEADERS)
+    for row in brackets:
+        ws.append(list(row))
+    brackets_path = out_dir / BRACKETS_PATH.name
+    wb.save(brackets_path)
+
+    rules_out = out_dir / BRACKET_RULES_PATH.name
+    rules_out.write_text(rules_text, encoding="utf-8")
+    return matrix_path, brackets_path, rules_out
+
+
+def random_entries(catalog, lines, seed=0):
+    # lines позиций со случайными количествами в синтаксисе матрицы; не больше, чем есть в каталоге
+    rnd = random.Random(seed)
+    products = list(catalog.articles.values())
+    quantities = ["1", "2", "3", "1+1", "2+3+1", "4", "10"]
+    return {(p.sheet, p.article): rnd.choice(quantities) for p in rnd.sample(products, min(lines, len(products)))}
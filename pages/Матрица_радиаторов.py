@@ -1,12 +1,55 @@
 import streamlit as st
 
+from radiatool.catalog import MATRIX_PATH, shared_store
+from radiatool.pivots import PIVOT_COLUMNS, build_pivots, overlay_quantities
+from radiatool.spec import parse_quantity
+
 st.set_page_config(
     page_title="Матрица радиаторов",
-    page_icon="📊"
+    page_icon="📊",
+    layout="wide"
 )
 
 st.title("📊 Матрица радиаторов")
 
-# Этот файл будет автоматически подхвачен Streamlit как отдельная страница
-# Основная логика находится в app.py
-st.info("Перейдите на главную страницу для работы с матрицей радиаторов")
\ No newline at end of file
+if not MATRIX_PATH.exists():
+    st.error("❌ Файл 'Матрица.xlsx' не найден в папке data/")
+    st.stop()
+
+# Значения виджетов главной страницы переприсваиваем, иначе Streamlit удалит их здесь
+for key in ("radiator_discount", "bracket_discount", "show_tooltips", "diagnostics"):
+    if key in st.session_state:
+        st.session_state[key] = st.session_state[key]
+
+# Тот же каталог, что на главной странице; сводные строятся раз на версию каталога,
+# перезапуск страницы берёт готовые таблицы
+@st.cache_resource(max_entries=2)
+def load_pivots(_catalog, version):
+    return build_pivots(_catalog)
+
+catalog = shared_store().current()
+pivots = load_pivots(catalog, catalog.version)
+
+column = st.radio("Показатель", PIVOT_COLUMNS, horizontal=True)
+connections = list(dict.fromkeys(name.rsplit(" ", 1)[0] for name in pivots))
+shown = st.multiselect("Вид подключения", connections, default=connections)
+
+# Количества с главной страницы, по листам
+quantities = {}
+for (sheet_name, art), value in st.session_state.get("entry_values", {}).items():
+    quantities.setdefault(sheet_name, {})[art] = parse_quantity(value)
+
+st.caption("Строки — длина, столбцы — высота, мм. Введённые на главной странице количества показаны как «значение × N».")
+column_config = {"_index": st.column_config.TextColumn("длина \\ высота, мм")}
+for sheet_name, pivot in pivots.items():
+    if sheet_name.rsplit(" ", 1)[0] not in shown:
+        continue
+    table, marked = overlay_quantities(pivot.text[column], pivot.cells, quantities.get(sheet_name, {}))
+    st.markdown(f"#### {sheet_name}")
+    if marked:
+        highlight = table.copy()
+        highlight[:] = ""
+        for cell in marked:
+            highlight.at[cell] = "background-color: #c8e6c9; font-weight: bold"
+        table = table.style.apply(lambda _: highlight, axis=None)
+    st.dataframe(table, column_config=column_config, use_container_width=True)
@@ -1,10 +1,57 @@
 import streamlit as st
 
+from radiatool.catalog import MATRIX_PATH, shared_store
+from radiatool.export import save_excel_spec
+from radiatool.spec import BRACKET_TYPES, SpecCache
+
 st.set_page_config(
-    page_title="Спецификация", 
-    page_icon="📋"
+    page_title="Спецификация",
+    page_icon="📋",
+    layout="wide"
 )
 
 st.title("📋 Спецификация")
 
-st.info("Перейдите на главную страницу для работы со спецификацией")
\ No newline at end of file
+if not MATRIX_PATH.exists():
+    st.error("❌ Файл 'Матрица.xlsx' не найден в папке data/")
+    st.stop()
+
+# Настройки главной страницы. Значения её виджетов переприсваиваем: иначе Streamlit
+# удалит их в конце перезапуска, где виджетов нет, и на главной они сбросятся
+for key, default in (("radiator_discount", 0.0), ("bracket_discount", 0.0), ("bracket_type", BRACKET_TYPES[0])):
+    st.session_state[key] = st.session_state.get(key, default)
+for key in ("show_tooltips", "diagnostics"):
+    if key in st.session_state:
+        st.session_state[key] = st.session_state[key]
+if "spec_cache" not in st.session_state:
+    st.session_state.spec_cache = SpecCache()
+
+catalog = shared_store().current()
+entries = st.session_state.get("entry_values", {})
+# Тот же spec_cache, что на главной: если позиции и настройки не менялись — готовый результат
+spec = st.session_state.spec_cache.result(
+    entries, catalog,
+    st.session_state.radiator_discount, st.session_state.bracket_discount, st.session_state.bracket_type,
+)
+
+st.caption(
+    f"Скидка на радиаторы: {st.session_state.radiator_discount:g}%, "
+    f"на кронштейны: {st.session_state.bracket_discount:g}%, крепление: {st.session_state.bracket_type}"
+)
+if spec.df.empty:
+    st.info("Заполните матрицу на главной странице, чтобы сгенерировать спецификацию.")
+    st.stop()
+
+totals = spec.totals
+col1, col2, col3, col4, col5 = st.columns(5)
+col1.metric("Сумма, руб (с НДС)", f"{totals['sum']:,.2f}".replace(",", " "))
+col2.metric("Радиаторов / кронштейнов", f"{int(totals['radiators'])} / {int(totals['brackets'])}")
+col3.metric("Мощность, Вт", f"{totals['power']:.2f}")
+col4.metric("Вес, кг", f"{round(totals['weight'], 1)}")
+col5.metric("Объем, м3", f"{round(totals['volume'], 3)}")
+
+st.dataframe(spec.df, use_container_width=True, hide_index=True)
+
+if st.button("Создать спецификацию METEOR"):
+    excel_data = save_excel_spec(spec.df, catalog, st.session_state.get("correspondence_df"), totals)
+    st.download_button("📥 Скачать Excel", excel_data, "Расчёт стоимости.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
@@ -0,0 +1,2 @@
+# radiatool/__init__.py
+# Расчётное ядро RadiaTool: каталог, спецификация, экспорт
@@ -0,0 +1,261 @@
+# radiatool/api.py
+# HTTP-сервис расчёта для CRM и скриптов сметчиков, без Streamlit:
+#   python -m radiatool.api --port 8601 --processes 4 --workers 8
+# POST /quote       -> JSON: строки спецификации, итоги, отклонённые позиции
+# POST /quote.xlsx  -> книга save_excel_spec
+# GET  /health      -> версия каталога
+# Тело запроса:
+#   {"items": [{"sheet": "VK-правое 22", "article": "7724655504", "qty": "2+1"},
+#              {"connection": "K-боковое", "type": "22", "height": 500, "length": 1000, "qty": 3}],
+#    "radiator_discount": 10, "bracket_discount": 5, "brackets": "wall"}
+# brackets — wall / floor / none или полное название режима из BRACKET_TYPES
+import argparse
+import json
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+import pandas as pd
+
+from radiatool.brackets import BRACKET_RULES_PATH
+from radiatool.catalog import BRACKETS_PATH, MATRIX_PATH, CatalogStore
+from radiatool.export import save_excel_spec
+from radiatool.quantities import ART_COL, HEIGHT_COL, LENGTH_COL, QTY_COL, SHEET_COL, resolve_quantities
+from radiatool.spec import BRACKET_MODES, BRACKET_TYPES, build_spec, spec_totals
+
+MAX_BODY = 10 * 1024 * 1024
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class QuoteError(ValueError):
+    pass
+
+
+# === Расчёт ===
+def items_frame(items):
+    # Позиции запроса -> таблица в формате resolve_quantities (как файл количеств)
+    if not isinstance(items, list):
+        raise QuoteError("items должен быть списком позиций")
+    rows = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise QuoteError("каждая позиция — объект JSON")
+        sheet = item.get("sheet")
+        if sheet is None and item.get("connection") is not None:
+            sheet = f"{item['connection']} {item.get('type', '')}".strip()
+        rows.append({
+            SHEET_COL: None if sheet is None else str(sheet),
+            ART_COL: None if item.get("article") is None else str(item["article"]),
+            HEIGHT_COL: item.get("height"),
+            LENGTH_COL: item.get("length"),
+            QTY_COL: None if item.get("qty") is None else str(item["qty"]),
+        })
+    return pd.DataFrame(rows, columns=[SHEET_COL, ART_COL, HEIGHT_COL, LENGTH_COL, QTY_COL], dtype=object)
+
+
+def quote_params(body):
+    try:
+        radiator_discount = float(body.get("radiator_discount", 0.0))
+        bracket_discount = float(body.get("bracket_discount", 0.0))
+    except (TypeError, ValueError):
+        raise QuoteError("скидки должны быть числами")
+    if not (0 <= radiator_discount <= 100 and 0 <= bracket_discount <= 100):
+        raise QuoteError("скидки должны быть от 0 до 100")
+    mode = body.get("brackets", "wall")
+    bracket_type = BRACKET_MODES.get(mode, mode)
+    if bracket_type not in BRACKET_TYPES:
+        raise QuoteError(f"brackets: одно из {', '.join(BRACKET_MODES)}")
+    return radiator_discount, bracket_discount, bracket_type
+
+
+def body_length(header):
+    # Content-Length запроса. Без проверки не число давало 500, а отрицательное — rfile.read(-1),
+    # который ждёт закрытия соединения клиентом
+    if header is None:
+        raise QuoteError("нужен заголовок Content-Length")
+    header = header.strip()
+    if not (header.isascii() and header.isdigit()):
+        raise QuoteError("Content-Length должен быть неотрицательным целым числом")
+    length = int(header)
+    if length > MAX_BODY:
+        raise QuoteError("слишком большой запрос")
+    return length
+
+
+def quote(body, catalog):
+    # -> (спецификация как в prepare_spec_data, отклонённые позиции)
+    if not isinstance(body, dict):
+        raise QuoteError("тело запроса — объект JSON")
+    params = quote_params(body)
+    entries, rejected = resolve_quantities(items_frame(body.get("items", [])), catalog)
+    return build_spec(entries, catalog, *params), rejected
+
+
+def _records(df):
+    # NaN (например, RadiatorType у кронштейнов) -> null
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def quote_json(body, catalog):
+    df, rejected = quote(body, catalog)
+    totals = {}
+    if not df.empty:
+        t = spec_totals(df, catalog)
+        totals = {
+            "sum": round(float(t["sum"]), 2),
+            "radiators": int(t["radiators"]),
+            "brackets": int(t["brackets"]),
+            "power": round(t["power"], 2),
+            "weight": round(t["weight"], 1),
+            "volume": round(t["volume"], 3),
+        }
+    return {
+        "catalog_version": catalog.version,
+        "lines": _records(df),
+        "totals": totals,
+        "rejected": _records(rejected.rename(columns=str)),
+    }
+
+
+# === HTTP ===
+class QuoteHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1: клиент держит соединение и не платит за новое на каждый расчёт
+    protocol_version = "HTTP/1.1"
+    server_version = "RadiaTool"
+    # Простаивающее соединение закрывается, чтобы не держать поток пула
+    timeout = 5
+    # Заголовки и тело уходят отдельными записями; без TCP_NODELAY ответ ждёт задержанного ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "catalog_version": self.server.store.current().version})
+        else:
+            self._send_json(404, {"error": "нет такого адреса"})
+
+    def do_POST(self):
+        if self.path not in ("/quote", "/quote.xlsx"):
+            self._send_json(404, {"error": "нет такого адреса"})
+            return
+        try:
+            try:
+                length = body_length(self.headers.get("Content-Length"))
+            except QuoteError:
+                # Тело не прочитано, и начало следующего запроса в соединении неизвестно
+                self.close_connection = True
+                raise
+            body = json.loads(self.rfile.read(length) or b"{}")
+            # Один снимок каталога на запрос, даже если файлы обновятся по ходу расчёта
+            catalog = self.server.store.current()
+            if self.path == "/quote":
+                self._send_json(200, quote_json(body, catalog))
+            else:
+                df, _ = quote(body, catalog)
+                if df.empty:
+                    raise QuoteError("нет позиций для расчёта")
+                self._send(200, save_excel_spec(df, catalog), XLSX_TYPE)
+        except (QuoteError, json.JSONDecodeError) as e:
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            self.log_error("%s", repr(e))
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    def _send(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class QuoteServer(HTTPServer):
+    # Соединения обслуживает пул из workers потоков, а не поток на каждое подключение
+    daemon_threads = True
+
+    def __init__(self, address, store, workers=8, quiet=False):
+        super().__init__(address, QuoteHandler)
+        self.store = store
+        self.quiet = quiet
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quote")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def serve(server, processes=1):
+    # Расчёт упирается в GIL, поэтому для параллельности — несколько процессов на одном
+    # слушающем сокете (fork после bind, соединения между ними раздаёт ядро). Каждый
+    # процесс держит свою копию каталога и сам следит за обновлением файлов
+    children = []
+    for _ in range(processes - 1):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os._exit(0)
+        children.append(pid)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m radiatool.api", description="HTTP-сервис расчёта спецификаций METEOR")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8601)
+    parser.add_argument("--processes", type=int, default=1, help="процессов (больше одного — только Linux/macOS)")
+    parser.add_argument("--workers", type=int, default=8, help="потоков обработки запросов в каждом процессе")
+    parser.add_argument("--data", type=Path, default=MATRIX_PATH.parent, help="папка с файлами каталога")
+    parser.add_argument("--quiet", action="store_true", help="не писать журнал запросов")
+    args = parser.parse_args(argv)
+
+    store = CatalogStore(args.data / MATRIX_PATH.name, args.data / BRACKETS_PATH.name, args.data / BRACKET_RULES_PATH.name)
+    # Каталог загружается до первого запроса; дальше store сам подхватывает новые файлы
+    store.current()
+    processes = max(1, args.processes)
+    if processes > 1 and not hasattr(os, "fork"):
+        print("--processes недоступен на этой платформе, работаем в одном процессе", file=sys.stderr)
+        processes = 1
+    server = QuoteServer((args.host, args.port), store, args.workers, args.quiet)
+    print(f"RadiaTool API: http://{args.host}:{server.server_port}, процессов: {processes}", file=sys.stderr)
+    serve(server, processes)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
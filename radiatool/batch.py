@@ -0,0 +1,115 @@
+# radiatool/batch.py
+# Пакетный расчёт папки проектов без интерфейса:
+#   python -m radiatool.batch projects/ --radiator-discount 12 --brackets floor -j 8
+# На каждый файл количеств (CSV/xlsx, см. radiatool/quantities.py) пишется спецификация
+# METEOR <проект>.xlsx, по всем проектам — сводный report.csv
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+import pandas as pd
+
+from radiatool.brackets import BRACKET_RULES_PATH, read_bracket_rules
+from radiatool.catalog import BRACKETS_PATH, MATRIX_PATH, build_catalog, load_catalog
+from radiatool.export import save_excel_spec
+from radiatool.quantities import read_quantity_table, resolve_quantities
+from radiatool.spec import BRACKET_MODES, BRACKET_TYPES, build_spec, spec_totals
+
+PROJECT_SUFFIXES = {".csv", ".xlsx"}
+REPORT_COLUMNS = [
+    "Проект", "Позиций", "Отклонено строк", "Радиаторов, шт", "Кронштейнов, шт",
+    "Сумма, руб (с НДС)", "Мощность, Вт", "Вес, кг", "Объем, м3", "Файл METEOR", "Ошибка",
+]
+
+# Каталог воркера: передаётся один раз при запуске процесса, а не с каждой задачей
+_catalog = None
+
+
+def _init_worker(catalog):
+    global _catalog
+    _catalog = catalog
+
+
+def price_project(path, output_dir, radiator_discount, bracket_discount, bracket_type, catalog=None):
+    catalog = catalog if catalog is not None else _catalog
+    path, output_dir = Path(path), Path(output_dir)
+    row = {"Проект": path.stem}
+    try:
+        entries, rejected = resolve_quantities(read_quantity_table(path), catalog)
+        row["Отклонено строк"] = len(rejected)
+        if len(rejected):
+            rejected.to_csv(output_dir / f"{path.stem}.rejected.csv", index=False, encoding="utf-8-sig")
+        df = build_spec(entries, catalog, radiator_discount, bracket_discount, bracket_type)
+        if df.empty:
+            row["Ошибка"] = "нет позиций для расчёта"
+            return row
+        out = output_dir / f"{path.stem}.xlsx"
+        out.write_bytes(save_excel_spec(df, catalog))
+        totals = spec_totals(df, catalog)
+        row.update({
+            "Позиций": len(df),
+            "Радиаторов, шт": int(totals["radiators"]),
+            "Кронштейнов, шт": int(totals["brackets"]),
+            "Сумма, руб (с НДС)": round(float(totals["sum"]), 2),
+            "Мощность, Вт": round(totals["power"], 2),
+            "Вес, кг": round(totals["weight"], 1),
+            "Объем, м3": round(totals["volume"], 3),
+            "Файл METEOR": out.name,
+        })
+    except Exception as e:
+        # Один испорченный файл не должен останавливать весь пакет
+        row["Ошибка"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def price_directory(input_dir, output_dir, catalog, radiator_discount=0.0, bracket_discount=0.0,
+                    bracket_type=BRACKET_TYPES[0], jobs=None):
+    input_dir, output_dir = Path(input_dir), Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    files = sorted(
+        p for p in input_dir.iterdir()
+        if p.is_file() and p.suffix.lower() in PROJECT_SUFFIXES and not p.name.startswith("~$")
+    )
+    args = (files, repeat(output_dir), repeat(radiator_discount), repeat(bracket_discount), repeat(bracket_type))
+    if jobs == 1 or len(files) <= 1:
+        rows = [price_project(*a, catalog=catalog) for a in zip(*args)]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(catalog,)) as pool:
+            rows = list(pool.map(price_project, *args))
+    report = pd.DataFrame(rows, columns=REPORT_COLUMNS)
+    report = report.astype({col: "Int64" for col in ("Позиций", "Отклонено строк", "Радиаторов, шт", "Кронштейнов, шт")})
+    report.to_csv(output_dir / "report.csv", index=False, encoding="utf-8-sig")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m radiatool.batch", description="Пакетный расчёт спецификаций METEOR")
+    parser.add_argument("input_dir", type=Path, help="папка с файлами количеств (CSV/xlsx)")
+    parser.add_argument("-o", "--output", type=Path, help="куда писать спецификации и report.csv (по умолчанию <input_dir>/METEOR)")
+    parser.add_argument("--radiator-discount", type=float, default=0.0, help="скидка на радиаторы, %%")
+    parser.add_argument("--bracket-discount", type=float, default=0.0, help="скидка на кронштейны, %%")
+    parser.add_argument("--brackets", choices=BRACKET_MODES, default="wall", help="крепление: wall, floor или none")
+    parser.add_argument("--data", type=Path, default=MATRIX_PATH.parent, help="папка с файлами каталога")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="число процессов")
+    args = parser.parse_args(argv)
+
+    catalog = build_catalog(
+        *load_catalog(args.data / MATRIX_PATH.name, args.data / BRACKETS_PATH.name),
+        read_bracket_rules(args.data / BRACKET_RULES_PATH.name),
+    )
+    report = price_directory(
+        args.input_dir, args.output or args.input_dir / "METEOR", catalog,
+        args.radiator_discount, args.bracket_discount, BRACKET_MODES[args.brackets], args.jobs,
+    )
+    if report.empty:
+        print(f"В {args.input_dir} нет файлов {', '.join(sorted(PROJECT_SUFFIXES))}", file=sys.stderr)
+        return 1
+    print(report.to_string(index=False))
+    return 1 if report["Ошибка"].notna().any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
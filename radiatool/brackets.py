@@ -0,0 +1,84 @@
+# radiatool/brackets.py
+import json
+from pathlib import Path
+
+import pandas as pd
+
+BRACKET_RULES_PATH = Path("data/bracket_rules.json")
+
+# Правило из bracket_rules.json:
+#   mode      — режим крепления ("Настенные кронштейны" / "Напольные кронштейны")
+#   types     — типы радиаторов, к которым применяется правило
+#   heights   — необязательный фильтр по высоте
+#   article   — один артикул кронштейна, или articles — {высота: артикул}
+#   qty       — кронштейнов на радиатор при любой длине, или
+#   lengths   — [[мин. длина, макс. длина, кол-во], ...]; вне диапазонов правило не срабатывает
+# Порядок правил в файле задаёт порядок кронштейнов в спецификации.
+
+
+# === Чтение правил ===
+def read_bracket_rules(path=BRACKET_RULES_PATH):
+    rules = json.loads(Path(path).read_text(encoding="utf-8"))
+    return [_normalize_rule(rule, f"Правило {i} в {Path(path).name}") for i, rule in enumerate(rules, 1)]
+
+
+def _normalize_rule(rule, where):
+    if ("article" in rule) == ("articles" in rule):
+        raise ValueError(f"{where}: нужно ровно одно из полей article/articles")
+    if ("qty" in rule) == ("lengths" in rule):
+        raise ValueError(f"{where}: нужно ровно одно из полей qty/lengths")
+    articles = rule.get("articles")
+    heights = rule.get("heights")
+    lengths = rule.get("lengths")
+    return {
+        "mode": rule["mode"],
+        "types": frozenset(str(t) for t in rule["types"]),
+        "heights": frozenset(int(h) for h in heights) if heights is not None else None,
+        "article": rule.get("article"),
+        "articles": {int(h): art for h, art in articles.items()} if articles is not None else None,
+        "qty": int(rule.get("qty", 0)),
+        "lengths": [tuple(int(v) for v in bounds) for bounds in lengths] if lengths is not None else None,
+    }
+
+
+# === Подбор кронштейнов ===
+def match_bracket_rules(rules, radiator_type, length, height, bracket_type, qty=1):
+    brackets = []
+    for rule in rules:
+        if rule["mode"] != bracket_type or radiator_type not in rule["types"]:
+            continue
+        if rule["heights"] is not None and height not in rule["heights"]:
+            continue
+        art = rule["article"] if rule["articles"] is None else rule["articles"].get(height)
+        if not art:
+            continue
+        qty_br = _rule_qty(rule, length)
+        if qty_br:
+            brackets.append((art, qty_br * qty))
+    return brackets
+
+
+def _rule_qty(rule, length):
+    if rule["lengths"] is None:
+        return rule["qty"]
+    for low, high, qty_br in rule["lengths"]:
+        if low <= length <= high:
+            return qty_br
+    return 0
+
+
+# === Компиляция в таблицу ===
+def compile_bracket_rules(rules, products, known_articles=None):
+    # Плотная таблица по всем сочетаниям (режим, тип, высота, длина) из каталога:
+    # строка на каждый кронштейн, seq — порядок внутри сочетания, k — штук на один радиатор
+    combos = products[["rad_type", "height", "length"]].dropna().drop_duplicates()
+    combos = combos.astype({"height": int, "length": int})
+    rows = []
+    for mode in dict.fromkeys(rule["mode"] for rule in rules):
+        for rad_type, height, length in combos.itertuples(index=False):
+            matched = match_bracket_rules(rules, rad_type, length, height, mode)
+            for seq, (art, k) in enumerate(matched):
+                # Кронштейны, которых нет в прайсе, в спецификацию не попадают
+                if known_articles is None or art in known_articles:
+                    rows.append((mode, rad_type, height, length, seq, art, k))
+    return pd.DataFrame(rows, columns=["mode", "rad_type", "height", "length", "seq", "article", "k"])
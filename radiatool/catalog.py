@@ -0,0 +1,336 @@
+# radiatool/catalog.py
+import hashlib
+import os
+import posixpath
+import shutil
+import threading
+import time
+import zipfile
+from collections import namedtuple
+from pathlib import Path
+from xml.etree import ElementTree
+
+import pandas as pd
+
+from radiatool.brackets import BRACKET_RULES_PATH, compile_bracket_rules, read_bracket_rules
+
+MATRIX_PATH = Path("data/Матрица.xlsx")
+BRACKETS_PATH = Path("data/Кронштейны.xlsx")
+BRACKETS_SHEET = "Кронштейны"
+# Версия формата скомпилированного каталога; менять при изменении read_sheets/read_brackets
+CACHE_FORMAT = 2
+# Строки (длины) и столбцы (высоты) матрицы ввода
+MATRIX_LENGTHS = list(range(400, 2100, 100))
+MATRIX_HEIGHTS = [300, 400, 500, 600, 900]
+
+# Компактные записи для поиска по артикулу
+Product = namedtuple("Product", "article name price power weight volume sheet height length rad_type")
+Bracket = namedtuple("Bracket", "article name price")
+# Каталог: индексы и таблицы, построенные по листам. Исходные листы в нём не хранятся —
+# после сборки они не нужны. Один экземпляр на процесс, общий для всех сессий; массивы
+# таблиц помечены только для чтения, запись в них падает, а не портит данные всем сессиям.
+# Листы радиаторов — ключи grid_index
+# version — отпечаток файлов данных (None, если каталог собран не из CatalogStore)
+Catalog = namedtuple("Catalog", "grid_index articles brackets products bracket_rules version", defaults=(None,))
+
+
+# === Чтение файлов каталога ===
+def read_sheets(matrix_path=MATRIX_PATH, names=None):
+    # Листы матрицы (все или только names); в read-only книге openpyxl разбирает лишь запрошенные
+    sheets = pd.read_excel(matrix_path, sheet_name=None if names is None else list(names), engine="openpyxl")
+    for name, df in sheets.items():
+        if name != BRACKETS_SHEET:
+            df['Артикул'] = df['Артикул'].astype(str).str.strip()
+            df['Вес, кг'] = pd.to_numeric(df['Вес, кг'], errors='coerce').fillna(0)
+            df['Объем, м3'] = pd.to_numeric(df['Объем, м3'], errors='coerce').fillna(0)
+    return sheets
+
+
+def read_brackets(brackets_path=BRACKETS_PATH):
+    brackets_df = pd.read_excel(brackets_path, engine="openpyxl")
+    brackets_df['Артикул'] = brackets_df['Артикул'].astype(str).str.strip()
+    return brackets_df
+
+
+def read_catalog(matrix_path=MATRIX_PATH, brackets_path=BRACKETS_PATH):
+    return read_sheets(matrix_path), read_brackets(brackets_path)
+
+
+# === Отпечатки ===
+def sheet_fingerprints(matrix_path=MATRIX_PATH):
+    # Лист -> отпечаток по CRC32 и размеру его XML внутри xlsx и общей таблицы строк.
+    # Берётся из оглавления zip-архива, без распаковки: меняются только отпечатки
+    # изменённых листов (правка цен не трогает остальные)
+    ns = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+    rel_id = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+    with zipfile.ZipFile(matrix_path) as z:
+        workbook = ElementTree.fromstring(z.read("xl/workbook.xml"))
+        rels = ElementTree.fromstring(z.read("xl/_rels/workbook.xml.rels"))
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels}
+        members = {info.filename: info for info in z.infolist()}
+        shared = members.get("xl/sharedStrings.xml")
+        shared = f"{shared.CRC}:{shared.file_size}" if shared else "-"
+        fingerprints = {}
+        for sheet in workbook.iterfind("m:sheets/m:sheet", ns):
+            target = targets[sheet.get(rel_id)]
+            member = members[target.lstrip("/") if target.startswith("/") else posixpath.normpath(f"xl/{target}")]
+            key = f"{CACHE_FORMAT}|{sheet.get('name')}|{member.CRC}:{member.file_size}|{shared}"
+            fingerprints[sheet.get("name")] = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return fingerprints
+
+
+def file_fingerprint(path):
+    h = hashlib.sha256(f"radiatool-{CACHE_FORMAT}".encode())
+    h.update(Path(path).read_bytes())
+    return h.hexdigest()[:16]
+
+
+def catalog_version(fingerprints, brackets_fp, rules_fp=""):
+    # Версия каталога целиком — ключ для кэшей, зависящих от цен и состава
+    h = hashlib.sha256("|".join([*fingerprints.values(), brackets_fp, rules_fp]).encode())
+    return h.hexdigest()[:12]
+
+
+# === Скомпилированный каталог (Arrow IPC рядом с xlsx, файл на лист) ===
+def load_catalog(matrix_path=MATRIX_PATH, brackets_path=BRACKETS_PATH, cache_dir=None, fingerprints=None):
+    # Листы с известным отпечатком читаются из скомпилированных файлов, остальные —
+    # из xlsx, и только они; разобранные сразу сохраняются для следующих запусков
+    cache_dir = Path(cache_dir) if cache_dir else Path(matrix_path).parent / ".catalog"
+    if fingerprints is None:
+        fingerprints = sheet_fingerprints(matrix_path)
+    brackets_fp = file_fingerprint(brackets_path)
+    sheets = {name: read_compiled(cache_dir / f"{fp}.arrow") for name, fp in fingerprints.items()}
+    missing = [name for name, df in sheets.items() if df is None]
+    if missing:
+        sheets.update(read_sheets(matrix_path, missing))
+    brackets_df = read_compiled(cache_dir / f"{brackets_fp}.arrow")
+    compile_brackets = brackets_df is None
+    if compile_brackets:
+        brackets_df = read_brackets(brackets_path)
+    try:
+        # Кэш необязателен: без него просто каждый раз разбираем xlsx
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for name in missing:
+            write_compiled(cache_dir / f"{fingerprints[name]}.arrow", sheets[name])
+        if compile_brackets:
+            write_compiled(cache_dir / f"{brackets_fp}.arrow", brackets_df)
+        if missing or compile_brackets:
+            prune_compiled(cache_dir, {*fingerprints.values(), brackets_fp})
+    except Exception:
+        pass
+    return sheets, brackets_df
+
+
+def read_compiled(path):
+    import pyarrow.feather as feather
+
+    try:
+        return feather.read_table(path, memory_map=True).to_pandas()
+    except Exception:
+        return None
+
+
+def write_compiled(path, df):
+    import pyarrow.feather as feather
+
+    # Пишем во временный файл и переименовываем: читатель не увидит недописанный лист.
+    # Без сжатия, чтобы чтение шло через memory map без распаковки
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    try:
+        feather.write_feather(df, tmp, compression="uncompressed")
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def prune_compiled(cache_dir, keep):
+    # Убираем листы прежних версий файлов и каталоги старого формата
+    for old in Path(cache_dir).iterdir():
+        if ".tmp-" in old.name or old.stem in keep:
+            continue
+        if old.is_dir():
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            # В Windows открытый через memory map файл не удалить — уберём при следующей сборке
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+# === Индексы ===
+def parse_dimensions(df):
+    # Высота и длина из наименования вида ".../300/400 ra"; NaN, если не разобрать
+    name_parts = df['Наименование'].astype(str).str.split('/')
+    heights = pd.to_numeric(name_parts.str[-2].str.replace('мм', '').str.strip(), errors='coerce')
+    lengths = pd.to_numeric(name_parts.str[-1].str.replace('мм', '').str.strip().str.split().str[0], errors='coerce')
+    return heights, lengths
+
+
+def build_grid_index(df):
+    # (высота, длина) -> (Артикул, позиция строки)
+    heights, lengths = parse_dimensions(df)
+    index = {}
+    for pos, (art, h, l) in enumerate(zip(df['Артикул'], heights, lengths)):
+        if pd.isna(h) or pd.isna(l):
+            continue
+        # Первое вхождение, как match.iloc[0] в прежнем поиске по подстроке
+        index.setdefault((int(h), int(l)), (str(art), pos))
+    return index
+
+
+def build_article_index(sheets):
+    # Артикул -> Product по всем листам радиаторов. Артикулы в каталоге уникальны; при повторе
+    # побеждает первый лист, и позиция с тем же артикулом на другом листе не считается
+    index = {}
+    for sheet_name, df in sheets.items():
+        if sheet_name == BRACKETS_SHEET:
+            continue
+        rad_type = sheet_name.split()[-1]
+        heights, lengths = parse_dimensions(df)
+        powers = df['Мощность, Вт'] if 'Мощность, Вт' in df else [0] * len(df)
+        rows = zip(df['Артикул'], df['Наименование'], df['Цена, руб'], powers,
+                   df['Вес, кг'], df['Объем, м3'], heights, lengths)
+        for art, name, price, power, weight, volume, h, l in rows:
+            if art in index:
+                continue
+            index[art] = Product(
+                str(art), str(name), float(price), float(power), float(weight), float(volume), sheet_name,
+                None if pd.isna(h) else int(h),
+                None if pd.isna(l) else int(l),
+                rad_type,
+            )
+    return index
+
+
+def build_bracket_index(brackets_df):
+    index = {}
+    for art, name, price in zip(brackets_df['Артикул'], brackets_df['Наименование'], brackets_df['Цена, руб']):
+        index.setdefault(art, Bracket(art, str(name), float(price)))
+    return index
+
+
+def build_products_frame(article_index):
+    # Те же записи Product в виде таблицы с индексом по артикулу — для join в расчёте спецификации.
+    # Строки артикулов и наименований — те же объекты, что в записях Product, а не копии;
+    # лист и тип повторяются тысячи раз и хранятся категориями, размеры — узкими целыми
+    products = pd.DataFrame.from_records(list(article_index.values()), columns=Product._fields)
+    products = products.astype({"sheet": "category", "rad_type": "category"})
+    for col in ("height", "length"):
+        products[col] = pd.to_numeric(products[col], downcast="integer")
+    return read_only_frame(products.set_index("article", drop=False))
+
+
+def read_only_frame(df):
+    # Та же таблица, но каждая колонка — отдельный массив (copy=False не склеивает их в общий
+    # блок), а числа и коды категорий помечены только для чтения. Колонки строк (object)
+    # остаются как есть: сравнения pandas 2.0 не принимают object-массив только для чтения.
+    # Выборки и reindex дают обычные копии
+    columns = {}
+    for name, col in df.items():
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            codes = col.cat.codes.to_numpy(copy=True)
+            codes.flags.writeable = False
+            columns[name] = pd.Categorical.from_codes(codes, dtype=col.dtype)
+        else:
+            values = col.to_numpy(copy=True)
+            values.flags.writeable = values.dtype == object
+            columns[name] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def matrix_frame(sheet_grid, entries, sheet_name, lengths=MATRIX_LENGTHS, heights=MATRIX_HEIGHTS):
+    # Таблица ввода листа: строка на длину, столбец на высоту; None — размера нет в каталоге
+    rows = [
+        [entries.get((sheet_name, sheet_grid[(h, l)][0]), "") if (h, l) in sheet_grid else None for h in heights]
+        for l in lengths
+    ]
+    return pd.DataFrame(rows, index=[str(l) for l in lengths], columns=[str(h) for h in heights])
+
+
+def build_catalog(sheets, brackets_df, bracket_rules=None, previous=None, changed=None, version=None):
+    # previous/changed — прежний каталог и изменившиеся листы: сетки остальных листов берутся
+    # из previous как есть. Сводные индексы (артикулы, таблица, правила) строятся заново
+    if bracket_rules is None:
+        bracket_rules = read_bracket_rules()
+    grid_index = {}
+    for name, df in sheets.items():
+        if name == BRACKETS_SHEET:
+            continue
+        if previous is not None and changed is not None and name not in changed and name in previous.grid_index:
+            grid_index[name] = previous.grid_index[name]
+        else:
+            grid_index[name] = build_grid_index(df)
+    articles = build_article_index(sheets)
+    brackets = build_bracket_index(brackets_df)
+    products = build_products_frame(articles)
+    rules_table = read_only_frame(compile_bracket_rules(bracket_rules, products, brackets))
+    return Catalog(grid_index, articles, brackets, products, rules_table, version)
+
+
+# === Горячая перезагрузка ===
+class CatalogStore:
+    # Текущий каталог процесса. Раз в interval секунд current() сверяет время изменения и
+    # размер файлов данных; если они изменились, перечитываются только листы с новым
+    # отпечатком, и готовый каталог подменяет прежний одним присваиванием. Перезапуск,
+    # уже получивший каталог, дорабатывает со своим экземпляром
+    def __init__(self, matrix_path=MATRIX_PATH, brackets_path=BRACKETS_PATH, rules_path=BRACKET_RULES_PATH,
+                 cache_dir=None, interval=2.0):
+        self.paths = (Path(matrix_path), Path(brackets_path), Path(rules_path))
+        self.cache_dir = cache_dir
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._catalog = None
+        self._stamp = None
+        self._fingerprints = {}
+        self._checked = float("-inf")
+
+    def current(self):
+        if self._catalog is not None and time.monotonic() - self._checked < self.interval:
+            return self._catalog
+        # Пока один поток пересобирает каталог, остальные работают с прежним
+        if not self._lock.acquire(blocking=self._catalog is None):
+            return self._catalog
+        try:
+            if self._catalog is None or time.monotonic() - self._checked >= self.interval:
+                self._refresh()
+        finally:
+            self._lock.release()
+        return self._catalog
+
+    def _refresh(self):
+        self._checked = time.monotonic()
+        stamp = tuple((p.stat().st_mtime_ns, p.stat().st_size) for p in self.paths)
+        if stamp == self._stamp:
+            return
+        matrix_path, brackets_path, rules_path = self.paths
+        try:
+            fingerprints = sheet_fingerprints(matrix_path)
+            version = catalog_version(fingerprints, file_fingerprint(brackets_path), file_fingerprint(rules_path))
+            if self._catalog is None or version != self._catalog.version:
+                changed = {name for name, fp in fingerprints.items() if self._fingerprints.get(name) != fp}
+                sheets, brackets_df = load_catalog(matrix_path, brackets_path, self.cache_dir, fingerprints)
+                self._catalog = build_catalog(
+                    sheets, brackets_df, read_bracket_rules(rules_path), self._catalog, changed, version,
+                )
+                self._fingerprints = fingerprints
+        except Exception:
+            # Файл ещё дописывается или испорчен: остаёмся на прежнем каталоге и пробуем снова
+            if self._catalog is None:
+                raise
+            return
+        self._stamp = stamp
+
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def shared_store():
+    # Один CatalogStore на процесс для главной страницы и страниц pages/ — каталог в памяти
+    # один, и версия, по которой кэшируются производные таблицы, у всех страниц общая
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = CatalogStore()
+        return _shared_store
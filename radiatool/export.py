@@ -0,0 +1,168 @@
+# radiatool/export.py
+import io
+
+from radiatool.spec import BRACKET_TYPES, NO_BRACKETS, parse_quantity, spec_totals
+
+SPEC_HEADERS = ["№", "Артикул", "Наименование", "Мощность, Вт", "Цена, руб (с НДС)", "Скидка, %", "Цена со скидкой, руб (с НДС)", "Кол-во", "Сумма, руб (с НДС)"]
+SPEC_COL_WIDTHS = {'A': 5, 'B': 12, 'C': 60, 'D': 15, 'E': 20, 'F': 10, 'G': 30, 'H': 10, 'I': 20}
+MONEY_FORMAT = '#,##0.00'
+
+
+# === Стили ===
+def _named_styles():
+    # Один набор именованных стилей на книгу вместо шрифта/рамки/выравнивания на каждую ячейку
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
+
+    thin = Side(border_style="thin")
+    border = Border(top=thin, left=thin, right=thin, bottom=thin)
+    center = Alignment(horizontal='center', vertical='center')
+    left = Alignment(horizontal='left', vertical='center')
+    plain = Font(name='Calibri', size=11)
+    bold = Font(name='Calibri', size=11, bold=True)
+    return [
+        NamedStyle("Спец. заголовок", font=bold, border=border, alignment=center),
+        NamedStyle("Спец. текст", font=plain, border=border, alignment=left),
+        NamedStyle("Спец. центр", font=plain, border=border, alignment=center),
+        NamedStyle("Спец. сумма", font=plain, border=border, alignment=center, number_format=MONEY_FORMAT),
+        NamedStyle("Спец. итого", font=bold, border=border, alignment=center),
+        NamedStyle("Спец. итого сумма", font=bold, border=border, alignment=center, number_format=MONEY_FORMAT),
+    ]
+
+# Стиль каждой колонки спецификации: A–I
+SPEC_ROW_STYLES = ["Спец. центр", "Спец. текст", "Спец. текст", "Спец. центр", "Спец. сумма", "Спец. центр", "Спец. сумма", "Спец. центр", "Спец. сумма"]
+SPEC_TOTAL_STYLES = ["Спец. итого"] * 4 + ["Спец. итого сумма", "Спец. итого", "Спец. итого сумма", "Спец. итого", "Спец. итого сумма"]
+
+
+def _styled_row(ws, values, styles):
+    from openpyxl.cell import WriteOnlyCell
+
+    row = []
+    for value, style in zip(values, styles):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        row.append(cell)
+    return row
+
+
+# === Excel ===
+def save_excel_spec(df, catalog, correspondence_df=None, totals=None):
+    # Потоковая запись (write-only): строки уходят в файл по мере формирования.
+    # totals — готовые итоги spec_totals (SpecResult), чтобы не считать их повторно
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    for style in _named_styles():
+        wb.add_named_style(style)
+    ws = wb.create_sheet("Спецификация")
+    for col, width in SPEC_COL_WIDTHS.items():
+        ws.column_dimensions[col].width = width
+
+    ws.append(_styled_row(ws, SPEC_HEADERS, ["Спец. заголовок"] * len(SPEC_HEADERS)))
+    power = df["Мощность, Вт"].where(~df["Наименование"].astype(str).str.contains("Кронштейн", regex=False), "")
+    rows = zip(
+        df["№"], df["Артикул"].astype(str), df["Наименование"], power,
+        df["Цена, руб (с НДС)"].astype(float), df["Скидка, %"].astype(float),
+        df["Цена со скидкой, руб (с НДС)"].astype(float), df["Кол-во"].astype(int),
+        df["Сумма, руб (с НДС)"].astype(float),
+    )
+    for values in rows:
+        ws.append(_styled_row(ws, values, SPEC_ROW_STYLES))
+
+    if totals is None:
+        totals = spec_totals(df, catalog)
+    total_row = len(df) + 2
+    ws.append(_styled_row(
+        ws, ["Итого", "", "", "", "", "", "", f"{int(totals['radiators'])}/{int(totals['brackets'])}", totals["sum"]],
+        SPEC_TOTAL_STYLES,
+    ))
+    ws.append([])
+    ws.append([f"Суммарный вес радиаторов без учета упаковки и кронштейнов- {round(totals['weight'],1)} кг."])
+    ws.append([f"Суммарный объем радиаторов без учета упаковки и кронштейнов- {round(totals['volume'],3)} м3."])
+    ws.merged_cells.add(f"A{total_row+2}:I{total_row+2}")
+    ws.merged_cells.add(f"A{total_row+3}:I{total_row+3}")
+
+    if correspondence_df is not None and not correspondence_df.empty:
+        ws2 = wb.create_sheet("Таблица соответствия")
+        columns = list(correspondence_df.columns)
+        # Ширины нужно задать до первой строки
+        for col_idx, col_name in enumerate(columns, 1):
+            max_len = max(len(str(col_name)), correspondence_df[col_name].astype(str).map(len).max())
+            ws2.column_dimensions[get_column_letter(col_idx)].width = min(max_len + 2, 50)
+        ws2.append(_styled_row(ws2, columns, ["Спец. заголовок"] * len(columns)))
+        styles = ["Спец. центр" if col == 2 else "Спец. текст" for col in range(1, len(columns) + 1)]
+        for values in correspondence_df.itertuples(index=False, name=None):
+            ws2.append(_styled_row(ws2, values, styles))
+
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+# === Обратное чтение ===
+def load_excel_spec(file, catalog):
+    # Спецификация, сохранённая save_excel_spec -> (entry_values, настройки, неизвестные артикулы).
+    # Книга читается потоково (read-only, только значения) до строки "Итого"; кронштейны
+    # не переносятся как позиции — по ним восстанавливаются скидка и режим крепления
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        ws = wb["Спецификация"] if "Спецификация" in wb.sheetnames else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = [str(v).strip() if v is not None else "" for v in next(rows, ())]
+        missing = [h for h in ("Артикул", "Скидка, %", "Кол-во") if h not in header]
+        if missing:
+            raise ValueError(f"Нет колонок {', '.join(missing)} — это не спецификация METEOR")
+        art_col, disc_col, qty_col = header.index("Артикул"), header.index("Скидка, %"), header.index("Кол-во")
+
+        quantities, unknown = {}, []
+        radiator_discount = bracket_discount = None
+        bracket_arts = set()
+        for row in rows:
+            if row and row[0] == "Итого":
+                break
+            if not row or len(row) <= qty_col or row[art_col] is None:
+                continue
+            art = str(row[art_col]).strip()
+            # Артикул, перепечатанный заказчиком как число
+            if art.endswith(".0") and art[:-2].isdigit():
+                art = art[:-2]
+            product = catalog.articles.get(art)
+            if product is not None:
+                key = (product.sheet, art)
+                quantities[key] = quantities.get(key, 0) + parse_quantity(row[qty_col])
+                if radiator_discount is None:
+                    radiator_discount = _row_discount(row[disc_col])
+            elif art in catalog.brackets:
+                bracket_arts.add(art)
+                if bracket_discount is None:
+                    bracket_discount = _row_discount(row[disc_col])
+            else:
+                unknown.append(art)
+    finally:
+        wb.close()
+
+    entries = {key: str(q) for key, q in quantities.items() if q > 0}
+    settings = {
+        "radiator_discount": radiator_discount or 0.0,
+        "bracket_discount": bracket_discount or 0.0,
+        "bracket_type": _bracket_mode(bracket_arts, catalog),
+    }
+    return entries, settings, unknown
+
+
+def _row_discount(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _bracket_mode(bracket_arts, catalog):
+    # Режим крепления, в таблице которого больше всего кронштейнов из файла
+    if not bracket_arts:
+        return NO_BRACKETS
+    rules = catalog.bracket_rules
+    hits = {mode: len(bracket_arts.intersection(rules.loc[rules["mode"] == mode, "article"])) for mode in BRACKET_TYPES}
+    return max(BRACKET_TYPES, key=lambda mode: hits.get(mode, 0))
@@ -0,0 +1,225 @@
+# radiatool/foreign.py
+# Импорт спецификаций других производителей: каждая строка сопоставляется с позицией
+# METEOR по data/mappings.json (точное совпадение), по размеру из наименования
+# ("11\500\400", "22-500-400") или по наиболее похожему известному наименованию
+import csv
+import io
+import json
+import re
+from collections import Counter, namedtuple
+from pathlib import Path
+
+import pandas as pd
+
+from radiatool.spec import parse_quantity
+
+MAPPINGS_PATH = Path("data/mappings.json")
+
+# exact: нормализованное наименование -> номер записи; records: (лист, Артикул, наименование METEOR);
+# tokens: слова каждой записи; postings: слово -> номера записей с ним
+MappingIndex = namedtuple("MappingIndex", "exact records tokens postings")
+
+CORRESPONDENCE_COLUMNS = ["Исходное наименование", "Кол-во", "Артикул METEOR", "Наименование METEOR", "Способ сопоставления"]
+NOT_FOUND = "не найдено"
+SKIPPED_QTY = "пропущено: количество не распознано"
+FUZZY_THRESHOLD = 0.8
+HEADER_SCAN_ROWS = 30
+
+SIZE_RE = re.compile(r"(?<!\d)(10|11|20|21|22|30|33)\s*[\\/\-–xх×*]\s*(\d{3})\s*[\\/\-–xх×*]\s*(\d{3,4})(?!\d)")
+TOKEN_RE = re.compile(r"[0-9a-zа-я]+")
+# Порядок важен: "VK-Profil" содержит "k-profil", а левое исполнение — тоже нижнее подключение
+CONNECTION_PATTERNS = [
+    ("VK-левое", re.compile(r"левое|левым|\bla\b|\bcvl\b")),
+    ("K-боковое", re.compile(r"(?<!v)k-profil|боков")),
+    ("VK-правое", re.compile(r"vk|нижн|ventil|valve|правое|\bra\b")),
+]
+
+
+# === Нормализация ===
+def normalize_name(name):
+    return " ".join(str(name).lower().replace("ё", "е").split())
+
+
+def name_tokens(norm):
+    # Слова без чисел: размеры сравниваются отдельно, а для похожести важна серия и исполнение
+    return frozenset(t for t in TOKEN_RE.findall(norm) if not t.isdigit())
+
+
+def parse_size(norm):
+    # (тип, высота, длина) по последнему вхождению размера в наименовании
+    matches = SIZE_RE.findall(norm)
+    if not matches:
+        return None
+    rad_type, height, length = matches[-1]
+    return rad_type, int(height), int(length)
+
+
+def detect_connection(norm):
+    for connection, pattern in CONNECTION_PATTERNS:
+        if pattern.search(norm):
+            return connection
+    return None
+
+
+# === Индекс соответствий ===
+def read_mappings(path=MAPPINGS_PATH):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def build_mapping_index(mappings, catalog):
+    exact, records, tokens = {}, [], []
+    postings = {}
+    for name, m in mappings.items():
+        art = str(m.get("meteor_art", "")).strip()
+        product = catalog.articles.get(art)
+        if product is None:
+            # Артикула нет в прайсе — пробуем по подключению, типу и размеру из записи
+            sheet = f"{m.get('connection')} {m.get('rad_type')}"
+            try:
+                cell = catalog.grid_index.get(sheet, {}).get((int(m["height"]), int(m["length"])))
+            except (KeyError, TypeError, ValueError):
+                cell = None
+            if cell is None:
+                continue
+            product = catalog.articles[cell[0]]
+        norm = normalize_name(name)
+        idx = len(records)
+        exact.setdefault(norm, idx)
+        records.append((product.sheet, product.article, product.name))
+        words = name_tokens(norm)
+        tokens.append(words)
+        for word in words:
+            postings.setdefault(word, []).append(idx)
+    return MappingIndex(exact, records, tokens, postings)
+
+
+def nearest_mapping(index, words):
+    # Лучшая запись по коэффициенту Жаккара; кандидаты — только записи с общими словами
+    shared = Counter(idx for word in words for idx in index.postings.get(word, ()))
+    best, best_score = None, 0.0
+    for idx, common in shared.items():
+        score = common / (len(words) + len(index.tokens[idx]) - common)
+        if score > best_score:
+            best, best_score = idx, score
+    return best, best_score
+
+
+def resolve_name(name, index, catalog):
+    # -> (лист, Артикул, наименование METEOR, способ) или None
+    norm = normalize_name(name)
+    idx = index.exact.get(norm)
+    if idx is not None:
+        return (*index.records[idx], "точное совпадение")
+    words = name_tokens(norm)
+    size = parse_size(norm)
+    if size is not None:
+        rad_type, height, length = size
+        connection, method = detect_connection(norm), "по размеру"
+        if connection is None:
+            # Подключение берём у похожего наименования только при том же пороге, что и для
+            # сопоставления по похожести: одно общее слово ("радиатор") — не основание
+            best, score = nearest_mapping(index, words)
+            if best is None or score < FUZZY_THRESHOLD:
+                return None
+            connection = index.records[best][0].rsplit(" ", 1)[0]
+            method = f"по размеру и похожему наименованию ({score:.0%})"
+        cell = catalog.grid_index.get(f"{connection} {rad_type}", {}).get((height, length))
+        if cell is not None:
+            product = catalog.articles[cell[0]]
+            return product.sheet, product.article, product.name, method
+        return None
+    best, score = nearest_mapping(index, words)
+    if best is not None and score >= FUZZY_THRESHOLD:
+        return (*index.records[best], f"похожее наименование ({score:.0%})")
+    return None
+
+
+# === Чтение файла ===
+def iter_rows(file, filename):
+    # Построчное чтение без загрузки всей книги: read-only openpyxl или csv.reader
+    suffix = Path(filename).suffix.lower()
+    if suffix == ".csv":
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+        except csv.Error:
+            dialect = csv.excel
+        try:
+            yield from csv.reader(text, dialect)
+        finally:
+            # Не закрываем загруженный файл вместе с обёрткой
+            text.detach()
+    elif suffix == ".xlsx":
+        from openpyxl import load_workbook
+
+        wb = load_workbook(file, read_only=True, data_only=True)
+        try:
+            yield from wb.worksheets[0].iter_rows(values_only=True)
+        finally:
+            wb.close()
+    else:
+        raise ValueError(f"Формат {suffix} не поддерживается — сохраните файл как .xlsx или .csv")
+
+
+def _find_columns(row):
+    cells = [str(v).lower() if v is not None else "" for v in row]
+    name_col = next((i for i, c in enumerate(cells) if "наименован" in c), None)
+    qty_col = next((i for i, c in enumerate(cells) if c.startswith("кол")), None)
+    if name_col is None or qty_col is None:
+        return None
+    return name_col, qty_col
+
+
+def _data_rows(rows):
+    # Шапку ищем в первых строках; если её нет — наименование в колонке A, количество в B
+    head = []
+    for row in rows:
+        columns = _find_columns(row)
+        if columns is not None:
+            name_col, qty_col = columns
+            break
+        head.append(row)
+        if len(head) >= HEADER_SCAN_ROWS:
+            name_col, qty_col = 0, 1
+            yield from ((r, name_col, qty_col) for r in head)
+            break
+    else:
+        yield from ((r, 0, 1) for r in head)
+        return
+    for row in rows:
+        yield row, name_col, qty_col
+
+
+# === Импорт ===
+def import_foreign_spec(file, filename, index, catalog):
+    # -> (entries {(лист, Артикул): количество}, таблица соответствия для save_excel_spec)
+    resolved = {}
+    lines = []
+    for row, name_col, qty_col in _data_rows(iter(iter_rows(file, filename))):
+        name = row[name_col] if len(row) > name_col else None
+        if name is None or not str(name).strip():
+            continue
+        raw_qty = row[qty_col] if len(row) > qty_col else None
+        qty = parse_quantity(raw_qty)
+        name = str(name).strip()
+        if qty <= 0:
+            # Строка остаётся в таблице соответствия, чтобы было видно, что не вошло в расчёт
+            shown = "" if raw_qty is None else str(raw_qty).strip()
+            lines.append((name, 0, "", "", f"{SKIPPED_QTY} «{shown}»", None, None))
+            continue
+        # Одинаковые наименования в спецификации повторяются — сопоставляем каждое один раз
+        if name not in resolved:
+            resolved[name] = resolve_name(name, index, catalog)
+        match = resolved[name]
+        if match is None:
+            lines.append((name, qty, "", "", NOT_FOUND, None, None))
+        else:
+            sheet, art, meteor_name, method = match
+            lines.append((name, qty, art, meteor_name, method, sheet, art))
+    table = pd.DataFrame(lines, columns=CORRESPONDENCE_COLUMNS + ["sheet", "art"])
+    found = table[table["sheet"].notna()]
+    totals = found.groupby(["sheet", "art"], sort=False)["Кол-во"].sum()
+    entries = {key: str(int(q)) for key, q in totals.items()}
+    return entries, table[CORRESPONDENCE_COLUMNS]
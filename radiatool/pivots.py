@@ -0,0 +1,60 @@
+# radiatool/pivots.py
+# Сводные таблицы листов каталога: длина × высота по цене, мощности, весу и объёму.
+# Строятся по сетке листа (grid_index) — в ячейках те же артикулы, что в матрице ввода.
+# Оси общие для всего каталога, чтобы листы можно было сравнивать строка в строку
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+PIVOT_COLUMNS = ["Мощность, Вт", "Цена, руб", "Вес, кг", "Объем, м3"]
+PIVOT_FORMATS = {"Мощность, Вт": "{:.0f}", "Цена, руб": "{:.2f}", "Вес, кг": "{:.2f}", "Объем, м3": "{:.4f}"}
+# Колонка листа -> поле таблицы catalog.products
+PIVOT_FIELDS = {"Мощность, Вт": "power", "Цена, руб": "price", "Вес, кг": "weight", "Объем, м3": "volume"}
+
+# values/text: колонка -> таблица чисел / готовых строк; cells: артикул -> (длина, высота)
+SheetPivot = namedtuple("SheetPivot", "values text cells")
+
+
+def build_pivots(catalog, columns=PIVOT_COLUMNS):
+    # Лист -> SheetPivot. Вызывается раз на версию каталога; перезапуск страницы только читает
+    grids = catalog.grid_index
+    lengths = sorted({l for grid in grids.values() for _, l in grid})
+    heights = sorted({h for grid in grids.values() for h, _ in grid})
+    row_of = {l: i for i, l in enumerate(lengths)}
+    col_of = {h: i for i, h in enumerate(heights)}
+    index, header = [str(l) for l in lengths], [str(h) for h in heights]
+
+    products = catalog.products
+    pivots = {}
+    for sheet_name, grid in grids.items():
+        keys = list(grid)
+        rows = np.fromiter((row_of[l] for _, l in keys), dtype=np.intp, count=len(keys))
+        cols = np.fromiter((col_of[h] for h, _ in keys), dtype=np.intp, count=len(keys))
+        # Значения ячеек — из записей товаров по артикулу ячейки
+        positions = products.index.get_indexer([grid[key][0] for key in keys])
+        values, text = {}, {}
+        for column in columns:
+            table = np.full((len(lengths), len(heights)), np.nan)
+            # Позиция -1 (артикула нет в таблице) указывает на добавленный в конец NaN
+            table[rows, cols] = np.append(products[PIVOT_FIELDS[column]].to_numpy(dtype=float), np.nan)[positions]
+            values[column] = pd.DataFrame(table, index=index, columns=header)
+            fmt = PIVOT_FORMATS.get(column, "{}").format
+            text[column] = pd.DataFrame(
+                [["" if np.isnan(v) else fmt(v) for v in row] for row in table], index=index, columns=header,
+            )
+        cells = {grid[(h, l)][0]: (str(l), str(h)) for h, l in keys}
+        pivots[sheet_name] = SheetPivot(values, text, cells)
+    return pivots
+
+
+def overlay_quantities(table, cells, quantities):
+    # quantities: артикул -> количество. Ячейки с количеством -> "значение × N";
+    # возвращает новую таблицу и список отмеченных ячеек (исходная не меняется — она в кэше)
+    marked = [(cells[art], qty) for art, qty in quantities.items() if qty > 0 and art in cells]
+    if not marked:
+        return table, []
+    table = table.copy()
+    for cell, qty in marked:
+        table.at[cell] = f"{table.at[cell]} × {qty}"
+    return table, [cell for cell, _ in marked]
@@ -0,0 +1,176 @@
+# radiatool/projects.py
+# Сохранённые проекты (расчёты) в локальной SQLite: позиции entry_values, скидки, режим
+# крепления и версия каталога. Сохранение пишет только изменённые ячейки (upsert/delete),
+# открытие — одно чтение по первичному ключу (проект, порядок ввода)
+import sqlite3
+from collections import namedtuple
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from radiatool.spec import BRACKET_TYPES
+
+PROJECTS_PATH = Path("data/projects.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    customer TEXT NOT NULL DEFAULT '',
+    created TEXT NOT NULL,
+    updated TEXT NOT NULL,
+    radiator_discount REAL NOT NULL DEFAULT 0,
+    bracket_discount REAL NOT NULL DEFAULT 0,
+    bracket_type TEXT NOT NULL,
+    catalog_version TEXT,
+    lines INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS projects_customer ON projects (customer, updated);
+CREATE INDEX IF NOT EXISTS projects_updated ON projects (updated);
+-- Порядок ввода (seq) влияет на спецификацию, поэтому он и есть ключ хранения:
+-- позиции проекта лежат подряд и читаются без сортировки
+CREATE TABLE IF NOT EXISTS entries (
+    project_id INTEGER NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    sheet TEXT NOT NULL,
+    article TEXT NOT NULL,
+    qty TEXT NOT NULL,
+    PRIMARY KEY (project_id, seq)
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX IF NOT EXISTS entries_cell ON entries (project_id, sheet, article);
+"""
+
+PROJECT_COLUMNS = ["id", "name", "customer", "created", "updated", "lines"]
+
+Project = namedtuple("Project", "id name customer created updated settings catalog_version entries")
+
+
+class ProjectError(ValueError):
+    pass
+
+
+class ProjectStore:
+    # Соединение открывается на каждую операцию: сессии Streamlit работают в разных потоках,
+    # а открыть файл SQLite дешевле, чем делить одно соединение под блокировкой
+    def __init__(self, path=PROJECTS_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            # WAL: чтение списка проектов не ждёт, пока другая сессия сохраняет свой
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def list(self, search="", customer=None, limit=200):
+        # Последние изменённые проекты; search — начало названия
+        query = f"SELECT {', '.join(PROJECT_COLUMNS)} FROM projects"
+        where, args = [], []
+        if search:
+            where.append("name LIKE ? ESCAPE '\\'")
+            args.append(search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        if customer:
+            where.append("customer = ?")
+            args.append(customer)
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY updated DESC LIMIT ?"
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query, [*args, limit]).fetchall()
+        return pd.DataFrame(rows, columns=PROJECT_COLUMNS)
+
+    def create(self, name, customer=""):
+        name = name.strip()
+        if not name:
+            raise ProjectError("Укажите название проекта")
+        now = _now()
+        try:
+            with closing(self._connect()) as conn, conn:
+                cur = conn.execute(
+                    "INSERT INTO projects (name, customer, created, updated, bracket_type) VALUES (?, ?, ?, ?, ?)",
+                    (name, customer.strip(), now, now, BRACKET_TYPES[0]),
+                )
+        except sqlite3.IntegrityError:
+            raise ProjectError(f"Проект «{name}» уже есть")
+        return cur.lastrowid
+
+    def open(self, project_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT id, name, customer, created, updated, radiator_discount, bracket_discount, bracket_type, catalog_version"
+                " FROM projects WHERE id = ?", (project_id,),
+            ).fetchone()
+            if row is None:
+                raise ProjectError("Проект не найден")
+            entries = {
+                (sheet, article): qty
+                for sheet, article, qty in conn.execute(
+                    "SELECT sheet, article, qty FROM entries WHERE project_id = ? ORDER BY seq", (project_id,),
+                )
+            }
+        pid, name, customer, created, updated, radiator_discount, bracket_discount, bracket_type, version = row
+        settings = {"radiator_discount": radiator_discount, "bracket_discount": bracket_discount, "bracket_type": bracket_type}
+        return Project(pid, name, customer, created, updated, settings, version, entries)
+
+    def save(self, project_id, entries, settings, catalog_version=None, saved=None, customer=None):
+        # saved — позиции на момент последнего open/save; пишутся только отличия от них.
+        # Новые позиции встают в конец, как в entry_values. -> число записанных ячеек
+        with closing(self._connect()) as conn, conn:
+            if saved is None:
+                saved = {
+                    (sheet, article): qty
+                    for sheet, article, qty in conn.execute(
+                        "SELECT sheet, article, qty FROM entries WHERE project_id = ? ORDER BY seq", (project_id,),
+                    )
+                }
+            # Позиции, идущие в порядке сохранённых, остаются на месте; с первой, что нарушает
+            # порядок (новая или удалённая и введённая заново), хвост переписывается в конец
+            order = list(entries)
+            seq = {key: i for i, key in enumerate(saved)}
+            split, last = len(order), -1
+            for i, key in enumerate(order):
+                if seq.get(key, -1) <= last:
+                    split = i
+                    break
+                last = seq[key]
+            head = set(order[:split])
+            removed = [key for key in saved if key not in head]
+            changed = [(key, entries[key]) for key in order[:split] if saved[key] != entries[key]]
+            changed += [(key, entries[key]) for key in order[split:]]
+            if removed:
+                conn.executemany(
+                    "DELETE FROM entries WHERE project_id = ? AND sheet = ? AND article = ?",
+                    [(project_id, sheet, article) for sheet, article in removed],
+                )
+            if changed:
+                (last,) = conn.execute("SELECT COALESCE(MAX(seq), -1) FROM entries WHERE project_id = ?", (project_id,)).fetchone()
+                # Изменённая ячейка сохраняет свой seq, новая получает следующий
+                conn.executemany(
+                    "INSERT INTO entries (project_id, seq, sheet, article, qty) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (project_id, sheet, article) DO UPDATE SET qty = excluded.qty",
+                    [(project_id, last + 1 + i, sheet, article, qty) for i, ((sheet, article), qty) in enumerate(changed)],
+                )
+            cur = conn.execute(
+                "UPDATE projects SET updated = ?, radiator_discount = ?, bracket_discount = ?, bracket_type = ?,"
+                " catalog_version = ?, lines = ? WHERE id = ?",
+                (_now(), float(settings["radiator_discount"]), float(settings["bracket_discount"]),
+                 settings["bracket_type"], catalog_version, len(entries), project_id),
+            )
+            if cur.rowcount == 0:
+                raise ProjectError("Проект не найден")
+            if customer is not None:
+                conn.execute("UPDATE projects SET customer = ? WHERE id = ?", (customer.strip(), project_id))
+        return len(changed) + len(removed)
+
+    def delete(self, project_id):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
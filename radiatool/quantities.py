@@ -0,0 +1,138 @@
+# radiatool/quantities.py
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from radiatool.spec import parse_quantities
+
+# Колонки таблицы количеств: лист + артикул, либо лист + высота + длина; Лист можно
+# не указывать, если есть Артикул. Кол-во — в синтаксисе матрицы ("2+3+1")
+SHEET_COL, ART_COL, HEIGHT_COL, LENGTH_COL, QTY_COL = "Лист", "Артикул", "Высота", "Длина", "Кол-во"
+REASON_COL = "Причина"
+CONNECTION_COL, TYPE_COL, LINE_COL = "Подключение", "Тип", "Строка"
+CHUNK_ROWS = 50_000
+
+
+def csv_separator(head):
+    # Разделитель по строке заголовка: Excel в русской локали пишет ";". Так CSV читает
+    # быстрый C-парсер pandas, а не python-движок с sep=None
+    first = head.splitlines()[0] if head else ""
+    return max(";,\t", key=first.count)
+
+
+def _open_csv(source):
+    # Путь или загруженный файл -> (источник для read_csv, разделитель)
+    if isinstance(source, (str, Path)):
+        with open(source, encoding="utf-8-sig") as f:
+            return source, csv_separator(f.readline())
+    head = source.read(4096)
+    source.seek(0)
+    if isinstance(head, bytes):
+        head = head.decode("utf-8-sig", errors="ignore")
+    return source, csv_separator(head)
+
+
+def read_quantity_table(path):
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        source, sep = _open_csv(path)
+        return pd.read_csv(source, dtype=str, sep=sep, encoding="utf-8-sig")
+    return pd.read_excel(path, dtype=str, engine="openpyxl")
+
+
+def import_quantity_csv(source, catalog, chunksize=CHUNK_ROWS):
+    # Большая выгрузка читается частями по chunksize строк; каждая часть проверяется
+    # resolve_quantities целиком, количества одинаковых позиций складываются между частями
+    source, sep = _open_csv(source)
+    totals, rejected = {}, []
+    for chunk in pd.read_csv(source, dtype=str, sep=sep, encoding="utf-8-sig", chunksize=chunksize):
+        entries, bad = resolve_quantities(chunk, catalog)
+        for key, qty in entries.items():
+            totals[key] = totals.get(key, 0) + int(qty)
+        if len(bad):
+            rejected.append(bad)
+    rejected = pd.concat(rejected) if rejected else pd.DataFrame(columns=[REASON_COL])
+    return {key: str(q) for key, q in totals.items()}, rejected
+
+
+def read_pasted_table(text):
+    # Таблица из буфера обмена: подключение, тип, высота, длина, количество (или лист одной
+    # колонкой вместо первых двух). Excel вставляет через табуляцию, CSV — через ";" или ",",
+    # без них колонки делятся пробелами. Строка заголовка необязательна.
+    # -> таблица для resolve_quantities с номером строки вставки в колонке "Строка"
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return pd.DataFrame(columns=[LINE_COL, SHEET_COL, HEIGHT_COL, LENGTH_COL, QTY_COL])
+    first = lines[0]
+    options = {"sep": csv_separator(first)} if any(c in first for c in ";,\t") else {"delim_whitespace": True}
+    try:
+        raw = pd.read_csv(io.StringIO("\n".join(lines)), header=None, dtype=str, skipinitialspace=True, **options)
+    except pd.errors.ParserError as e:
+        raise ValueError(f"Разное число колонок в строках: {e}")
+    if raw.shape[1] not in (4, 5):
+        raise ValueError("Нужно 5 колонок (подключение, тип, высота, длина, количество) или 4 (лист, высота, длина, количество)")
+    raw = raw.apply(lambda col: col.str.strip())
+    raw.index = pd.RangeIndex(1, len(raw) + 1, name=LINE_COL)
+    # Заголовок — первая строка, в которой высота не число
+    if pd.isna(pd.to_numeric(raw.iloc[0, -3], errors="coerce")):
+        raw = raw.iloc[1:]
+    if raw.shape[1] == 5:
+        sheet = raw[0].fillna("") + " " + raw[1].fillna("")
+        out = pd.DataFrame({CONNECTION_COL: raw[0], TYPE_COL: raw[1], SHEET_COL: sheet.str.strip()})
+    else:
+        out = pd.DataFrame({SHEET_COL: raw[0]})
+    out[HEIGHT_COL], out[LENGTH_COL], out[QTY_COL] = raw.iloc[:, -3], raw.iloc[:, -2], raw.iloc[:, -1]
+    return out.reset_index()
+
+
+def resolve_quantities(df, catalog):
+    # Строки таблицы -> entry_values {(лист, Артикул): количество}; повторы складываются.
+    # Вторым значением возвращаются отклонённые строки с колонкой "Причина"
+    df = df.rename(columns=lambda c: str(c).strip())
+    if QTY_COL not in df:
+        raise ValueError(f"Нет колонки '{QTY_COL}'")
+    n = len(df)
+    blank = pd.Series([""] * n, index=df.index)
+    sheet = df[SHEET_COL].fillna("").astype(str).str.strip() if SHEET_COL in df else blank
+    art = df[ART_COL].fillna("").astype(str).str.strip() if ART_COL in df else blank
+    # Артикулы из Excel могут прийти как "7724651304.0"
+    art = art.str.replace(r"^(\d+)\.0$", r"\1", regex=True)
+    height = pd.to_numeric(df[HEIGHT_COL], errors="coerce") if HEIGHT_COL in df else pd.Series(float("nan"), index=df.index)
+    length = pd.to_numeric(df[LENGTH_COL], errors="coerce") if LENGTH_COL in df else pd.Series(float("nan"), index=df.index)
+
+    qty = pd.Series(parse_quantities(df[QTY_COL]), index=df.index)
+
+    products = catalog.products
+    reason = pd.Series("", index=df.index, dtype=object)
+
+    # Позиции, заданные высотой и длиной: ищем артикул в сетке листа
+    by_size = (art == "") & height.notna() & length.notna()
+    if by_size.any():
+        grid = products.drop_duplicates(["sheet", "height", "length"])
+        grid_keys = pd.MultiIndex.from_arrays([grid["sheet"], grid["height"].astype("float64"), grid["length"].astype("float64")])
+        wanted = pd.MultiIndex.from_arrays([sheet[by_size], height[by_size].astype("float64"), length[by_size].astype("float64")])
+        found = grid_keys.get_indexer(wanted)
+        art = art.copy()
+        art[by_size] = np.where(found >= 0, grid["article"].to_numpy()[found], "")
+        reason[by_size & (art == "")] = "нет размера на листе"
+
+    pos = products.index.get_indexer(art)
+    known = pos >= 0
+    product_sheet = pd.Series(products["sheet"].to_numpy()[pos], index=df.index).where(known, "")
+    sheet = sheet.where(sheet != "", product_sheet)
+
+    reason[(reason == "") & (art == "")] = "нет артикула или размера"
+    reason[(reason == "") & ~known] = "артикул не найден"
+    reason[(reason == "") & ~sheet.isin(list(catalog.grid_index))] = "лист не найден"
+    reason[(reason == "") & (sheet != product_sheet)] = "артикул с другого листа"
+    reason[(reason == "") & (qty <= 0)] = "нулевое или неверное количество"
+
+    ok = reason == ""
+    rejected = df[~ok].assign(**{REASON_COL: reason[~ok]})
+    if not ok.any():
+        return {}, rejected
+    totals = pd.DataFrame({"sheet": sheet[ok], "art": art[ok], "qty": qty[ok]}).groupby(["sheet", "art"], sort=False)["qty"].sum()
+    entries = {key: str(int(q)) for key, q in totals.items()}
+    return entries, rejected
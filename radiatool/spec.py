@@ -0,0 +1,476 @@
+# radiatool/spec.py
+import hashlib
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from radiatool.tracing import mark_cache_miss
+
+BRACKET_TYPES = ["Настенные кронштейны", "Напольные кронштейны", "Без кронштейнов"]
+NO_BRACKETS = "Без кронштейнов"
+# Короткие имена режимов крепления для командной строки и API
+BRACKET_MODES = {"wall": BRACKET_TYPES[0], "floor": BRACKET_TYPES[1], "none": BRACKET_TYPES[2]}
+# Сколько готовых спецификаций (с итогами) держит SpecCache на сессию
+SPEC_RESULTS = 8
+
+# Готовая спецификация: ключ spec_key, таблица и итоги spec_totals (None для пустой)
+SpecResult = namedtuple("SpecResult", "key df totals")
+
+
+# === Вспомогательные функции ===
+def parse_quantity(val):
+    if not val:
+        return 0
+    try:
+        if isinstance(val, (int, float)):
+            return int(round(float(val)))
+        val = str(val).strip()
+        while val.startswith('+'): val = val[1:]
+        while val.endswith('+'): val = val[:-1]
+        if not val: return 0
+        return sum(int(round(float(part.strip()))) for part in val.split('+') if part.strip())
+    except:
+        return 0
+
+SMALL_UNIQUE = 64
+
+def parse_quantities(values):
+    # parse_quantity для целой колонки. Разные строки количества повторяются тысячами, поэтому
+    # колонка сначала сводится к уникальным значениям (factorize), а они разбираются строковыми
+    # операциями pandas; строка с хотя бы одной неверной частью даёт 0, как и там
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+    if len(uniques) == 0:
+        return np.zeros(len(codes), dtype="int64")
+    if len(uniques) <= SMALL_UNIQUE:
+        # На паре десятков значений накладные расходы pandas дороже самого разбора
+        parsed = np.fromiter(map(parse_quantity, uniques), dtype="int64", count=len(uniques))
+    else:
+        parsed = _parse_unique(pd.Series(uniques, dtype=object))
+    parsed = np.append(parsed, 0)
+    # Код -1 (пустая ячейка) указывает на добавленный в конец 0
+    return parsed[codes]
+
+def _parse_unique(s):
+    text = s.astype(str).str.strip().str.strip("+")
+    parts = text.str.split("+", expand=True).stack().str.strip()
+    parts = parts[parts != ""]
+    number = pd.to_numeric(parts, errors="coerce")
+    # Что не понял to_numeric, но понимает float() ("1_000"), — разбираем по одному
+    odd = number.isna()
+    if odd.any():
+        number[odd] = parts[odd].map(_float_or_nan)
+    number = number.astype(float)
+    bad = ~np.isfinite(number)
+    # round() в parse_quantity — банковское округление, np.rint округляет так же
+    row = parts.index.get_level_values(0)
+    qty = pd.Series(np.rint(number.where(~bad, 0)).astype("int64").to_numpy(), index=row)
+    result = qty.groupby(level=0).sum().reindex(range(len(s)), fill_value=0).to_numpy()
+    invalid = pd.Series(bad.to_numpy(), index=row).groupby(level=0).any().reindex(range(len(s)), fill_value=False)
+    result[invalid.to_numpy()] = 0
+    # Числа (не строки, например из xlsx) parse_quantity округляет целиком; NaN и inf дают 0
+    types = s.map(type)
+    numeric = types.map({t: issubclass(t, (int, float)) for t in types.unique()}).to_numpy(dtype=bool)
+    if numeric.any():
+        number = s[numeric].astype(float).to_numpy()
+        result[numeric] = np.rint(np.where(np.isfinite(number), number, 0)).astype("int64")
+    return result
+
+def _float_or_nan(text):
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+def round2(values):
+    # Встроенный round(x, 2), а не np.round: np.round умножает на 100 и теряет
+    # точность на «половинках», а итог должен совпадать копейка в копейку
+    return np.fromiter((round(v, 2) for v in np.asarray(values, dtype=float).tolist()), dtype=float, count=len(values))
+
+
+# === Расчёт спецификации ===
+def build_spec(entries, catalog, radiator_discount=0.0, bracket_discount=0.0, bracket_type=BRACKET_TYPES[0]):
+    # entries: {(лист, Артикул): строка количества}, как st.session_state.entry_values
+    radiators, rad_types, _ = _radiator_lines(entries, catalog, radiator_discount)
+    if radiators is None:
+        return pd.DataFrame([])
+    brackets = None
+    if bracket_type != NO_BRACKETS:
+        contrib = _bracket_contributions(radiators, rad_types, catalog, bracket_discount, bracket_type)
+        brackets = _aggregate_brackets(contrib, catalog, bracket_discount)
+    return _assemble(radiators, brackets)
+
+def _radiator_lines(entries, catalog, radiator_discount):
+    # Строки радиаторов в порядке ввода, ещё без сортировки и нумерации, тип радиатора
+    # строкой и номера попавших в таблицу позиций entries
+    if not entries:
+        return None, None, None
+    keys = list(entries.keys())
+    lines = pd.DataFrame({
+        "sheet": [k[0] for k in keys],
+        "art": [k[1] for k in keys],
+        "raw": list(entries.values()),
+    })
+    # Одинаковых строк количества обычно мало — разбираем каждую один раз
+    raw_unique = lines["raw"].drop_duplicates()
+    parsed = dict(zip(raw_unique, map(parse_quantity, raw_unique)))
+    lines["qty"] = lines["raw"].map(parsed).astype("int64")
+    # Товар должен быть на листе позиции: артикул с другого листа (перенесённый при
+    # обновлении каталога) пропускается, как при поиске в листе в прежнем расчёте
+    pos = catalog.products.index.get_indexer(lines["art"])
+    same_sheet = catalog.products["sheet"].to_numpy()[pos] == lines["sheet"].to_numpy()
+    keep = (lines["qty"].to_numpy() > 0) & (pos >= 0) & same_sheet
+    if not keep.any():
+        return None, None, None
+    lines = lines[keep].reset_index(drop=True)
+    products = catalog.products.iloc[pos[keep]].reset_index(drop=True)
+
+    qty = lines["qty"].to_numpy()
+    price = products["price"].to_numpy(dtype=float)
+    disc_price = round2(price * (1 - radiator_discount / 100))
+    radiators = _radiator_frame(
+        products["article"].to_numpy(), products["name"].to_numpy(), products["power"].to_numpy(),
+        price, radiator_discount, disc_price, qty, round2(disc_price * qty),
+        np.where(lines["sheet"].str.contains("VK", regex=False), "VK", "K"),
+        products["rad_type"].astype(int), products["height"].astype(int), products["length"].astype(int),
+    )
+    return radiators, products["rad_type"], np.flatnonzero(keep)
+
+def _radiator_frame(article, name, power, price, radiator_discount, disc_price, qty, amount, connection, rad_type, height, length):
+    # Общая для build_spec и SpecCache таблица строк радиаторов: типы колонок заданы явно,
+    # чтобы из массивов и из списков получалась одна и та же таблица
+    return pd.DataFrame({
+        "№": 0,
+        "Артикул": np.asarray(article, dtype=object),
+        "Наименование": np.asarray(name, dtype=object),
+        "Мощность, Вт": np.asarray(power, dtype=float),
+        "Цена, руб (с НДС)": np.asarray(price, dtype=float),
+        "Скидка, %": radiator_discount,
+        "Цена со скидкой, руб (с НДС)": np.asarray(disc_price, dtype=float),
+        "Кол-во": np.asarray(qty, dtype="int64"),
+        "Сумма, руб (с НДС)": np.asarray(amount, dtype=float),
+        "ConnectionType": np.asarray(connection, dtype=object),
+        "RadiatorType": np.asarray(rad_type, dtype="int64"),
+        "Height": np.asarray(height, dtype="int64"),
+        "Length": np.asarray(length, dtype="int64"),
+    })
+
+def _bracket_contributions(radiators, rad_types, catalog, bracket_discount, bracket_type):
+    # Кронштейны по строкам радиаторов: один join с заранее скомпилированной таблицей правил.
+    # Сумма каждой строки уже округлена — дальше она только складывается
+    table = catalog.bracket_rules
+    table = table[table["mode"] == bracket_type]
+    if table.empty:
+        return None
+    lines = pd.DataFrame({
+        "line": np.arange(len(radiators)),
+        "rad_type": rad_types.to_numpy(),
+        "height": radiators["Height"].to_numpy(),
+        "length": radiators["Length"].to_numpy(),
+        "qty": radiators["Кол-во"].to_numpy(),
+    })
+    expanded = lines.merge(table, on=["rad_type", "height", "length"], how="inner", sort=False)
+    if expanded.empty:
+        return None
+    # Порядок как при обходе строк: по строкам ввода, внутри строки — по порядку правил
+    expanded = expanded.iloc[np.lexsort((expanded["seq"].to_numpy(), expanded["line"].to_numpy()))]
+    qty_b = expanded["k"].to_numpy() * expanded["qty"].to_numpy()
+    b_price = np.array([catalog.brackets[a].price for a in expanded["article"]], dtype=float)
+    b_disc_price = round2(b_price * (1 - bracket_discount / 100))
+    return pd.DataFrame({
+        "line": expanded["line"].to_numpy(),
+        "seq": expanded["seq"].to_numpy(),
+        "art": expanded["article"].to_numpy(),
+        "qty": qty_b,
+        "amount": round2(b_disc_price * qty_b),
+    })
+
+def _aggregate_brackets(contrib, catalog, bracket_discount):
+    if contrib is None or contrib.empty:
+        return None
+    # Группы — артикулы без пробелов по краям, в порядке первого появления. Обрезаются только
+    # уникальные артикулы, а не каждая строка; np.add.at складывает последовательно, как += в цикле
+    raw_codes, raw_arts = pd.factorize(contrib["art"])
+    group_of, arts = pd.factorize(pd.Series(raw_arts, dtype=object).str.strip())
+    codes = group_of[raw_codes]
+    qty_sum = np.zeros(len(arts), dtype="int64")
+    amount_sum = np.zeros(len(arts), dtype=float)
+    np.add.at(qty_sum, codes, contrib["qty"].to_numpy())
+    np.add.at(amount_sum, codes, contrib["amount"].to_numpy())
+    first_art = np.asarray(raw_arts, dtype=object)[np.unique(group_of, return_index=True)[1]]
+
+    info = [catalog.brackets[a] for a in first_art]
+    price = np.array([b.price for b in info], dtype=float)
+    return pd.DataFrame({
+        "№": 0,
+        "Артикул": first_art,
+        "Наименование": [b.name for b in info],
+        "Мощность, Вт": 0.0,
+        "Цена, руб (с НДС)": price,
+        "Скидка, %": bracket_discount,
+        "Цена со скидкой, руб (с НДС)": round2(price * (1 - bracket_discount / 100)),
+        "Кол-во": qty_sum,
+        "Сумма, руб (с НДС)": amount_sum,
+        "ConnectionType": "Bracket",
+    })
+
+def _assemble(radiators, brackets):
+    # Сортировка радиаторов; lexsort устойчив, так что равные строки остаются в порядке ввода
+    order = np.lexsort((
+        radiators["Length"].to_numpy(),
+        radiators["Height"].to_numpy(),
+        radiators["RadiatorType"].to_numpy(),
+        (radiators["ConnectionType"] != "VK").to_numpy(),
+    ))
+    radiators = radiators.iloc[order].reset_index(drop=True)
+    radiators["№"] = np.arange(1, len(radiators) + 1)
+    if brackets is None or brackets.empty:
+        return radiators
+    brackets["№"] = np.arange(len(radiators) + 1, len(radiators) + len(brackets) + 1)
+    return pd.concat([radiators, brackets], ignore_index=True)
+
+
+# === Итоги ===
+def spec_totals(df, catalog):
+    # Итоговые количества, мощность, вес и объём одним проходом по колонкам
+    names = df["Наименование"].astype(str)
+    is_bracket = names.str.contains("Кронштейн", regex=False).to_numpy()
+    qty = df["Кол-во"].astype(int).to_numpy()
+    products = catalog.products.reindex(df["Артикул"].astype(str))
+    radiator_qty = qty * ~is_bracket
+    return {
+        "sum": df["Сумма, руб (с НДС)"].sum(),
+        "radiators": df.loc[df["Наименование"].str.contains("Радиатор", na=False), "Кол-во"].sum(),
+        "brackets": df.loc[df["Наименование"].str.contains("Кронштейн", na=False), "Кол-во"].sum(),
+        "power": _sequential_sum(df["Мощность, Вт"].astype(float).to_numpy() * radiator_qty),
+        "weight": _sequential_sum(products["weight"].fillna(0).to_numpy(dtype=float) * radiator_qty),
+        "volume": _sequential_sum(products["volume"].fillna(0).to_numpy(dtype=float) * radiator_qty),
+    }
+
+
+def _sequential_sum(values):
+    # cumsum складывает строго слева направо, как += в цикле. Попарное суммирование .sum()
+    # расходится в последнем бите, а веса с сотыми часто дают ровно «...,x5» перед round(…, 1)
+    return float(np.cumsum(values)[-1]) if len(values) else 0.0
+
+
+def spec_key(entries, catalog_version, radiator_discount, bracket_discount, bracket_type):
+    # Порядок ввода входит в ключ: от него зависят порядок равных строк и суммы кронштейнов
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((catalog_version, float(radiator_discount), float(bracket_discount), bracket_type)).encode())
+    h.update(repr(list(entries.items())).encode())
+    return h.hexdigest()
+
+
+# === Инкрементальный пересчёт ===
+# Типы колонок строки радиатора (порядок _radiator_frame без скидки) и строки кронштейна
+RADIATOR_DTYPES = (object, object, float, float, float, "int64", float, object, "int64", "int64", "int64")
+RADIATOR_COLUMNS = [
+    "Артикул", "Наименование", "Мощность, Вт", "Цена, руб (с НДС)", "Цена со скидкой, руб (с НДС)", "Кол-во",
+    "Сумма, руб (с НДС)", "ConnectionType", "RadiatorType", "Height", "Length",
+]
+CONTRIB_DTYPES = (object, "int64", float)
+# С какого числа изменённых ячеек строки считаются разом, как в build_spec, а не по одной
+BULK_LINES = 256
+
+
+class _Slots:
+    # Колонки строк, адресуемые номером слота: правка ячейки переписывает свой слот,
+    # новая строка занимает следующий. Освободившиеся слоты ждут compact
+    def __init__(self, dtypes):
+        self.columns = [np.empty(64, dtype=dtype) for dtype in dtypes]
+        self.size = 0
+
+    def alloc(self, n):
+        start = self.size
+        if start + n > len(self.columns[0]):
+            capacity = max(2 * len(self.columns[0]), start + n)
+            self.columns = [np.concatenate([c, np.empty(capacity - len(c), dtype=c.dtype)]) for c in self.columns]
+        self.size += n
+        return start
+
+    def write(self, slots, rows):
+        if rows:
+            slots = np.asarray(slots, dtype=np.intp)
+            for column, values in zip(self.columns, zip(*rows)):
+                column[slots] = values
+
+    def extend(self, columns):
+        # Дописать строки подряд целыми колонками -> номер первого слота
+        start = self.alloc(len(columns[0]))
+        for column, values in zip(self.columns, columns):
+            column[start:self.size] = values
+        return start
+
+    def take(self, index):
+        return [c[index] for c in self.columns]
+
+    def compact(self, index):
+        # Оставить только строки index, подряд в этом порядке
+        self.columns = self.take(index)
+        self.size = len(index)
+
+
+class SpecCache:
+    # Спецификации сессии. result() отдаёт готовые SpecResult по spec_key; при промахе build()
+    # пересчитывает только изменённые ячейки. Строка радиатора и её кронштейны лежат в слотах
+    # колонок по ключу (лист, Артикул); сводка кронштейнов, сортировка и нумерация собираются
+    # заново в порядке ввода теми же _aggregate_brackets и _assemble, что в build_spec, —
+    # результат совпадает с ним до копейки. Смена скидок, режима крепления или каталога
+    # пересчитывает все строки. Возвращаемые таблицы общие для всех вызовов — не изменять их.
+
+    def __init__(self):
+        self._reset(None, None)
+        self._results = OrderedDict()
+        self._results_catalog = None
+
+    def _reset(self, catalog, params):
+        self._catalog = catalog
+        self._params = params
+        self._entries = {}
+        # ключ -> (слот радиатора, первый слот кронштейнов, число кронштейнов)
+        self._slots = {}
+        self._radiators = _Slots(RADIATOR_DTYPES)
+        self._contrib = _Slots(CONTRIB_DTYPES)
+        self._rules = {} if catalog is None else _bracket_lookup(catalog, *params[1:])
+
+    def build(self, entries, catalog, radiator_discount=0.0, bracket_discount=0.0, bracket_type=BRACKET_TYPES[0]):
+        params = (radiator_discount, bracket_discount, bracket_type)
+        if catalog is not self._catalog or params != self._params:
+            self._reset(catalog, params)
+        previous = self._entries
+        for key in previous.keys() - entries.keys():
+            self._slots.pop(key, None)
+        missing = object()
+        changed = [key for key, raw in entries.items() if previous.get(key, missing) != raw]
+        if len(changed) >= BULK_LINES:
+            self._build_bulk(changed, entries)
+        else:
+            self._build_lines(changed, entries)
+        self._entries = dict(entries)
+        return self._collect(entries)
+
+    def _build_lines(self, changed, entries):
+        # Немного правок: каждая ячейка считается отдельно и по возможности
+        # переписывает свои прежние слоты
+        rows, row_slots, contrib, contrib_slots = [], [], [], []
+        for key in changed:
+            raw = entries[key]
+            old = self._slots.pop(key, None)
+            line = self._line(key, raw)
+            if line is None:
+                continue
+            row, brackets = line
+            if old is not None and old[2] == len(brackets):
+                slot, start = old[0], old[1]
+            else:
+                slot, start = self._radiators.alloc(1), self._contrib.alloc(len(brackets))
+            self._slots[key] = (slot, start, len(brackets))
+            rows.append(row)
+            row_slots.append(slot)
+            contrib.extend(brackets)
+            contrib_slots.extend(range(start, start + len(brackets)))
+        self._radiators.write(row_slots, rows)
+        self._contrib.write(contrib_slots, contrib)
+
+    def _build_bulk(self, changed, entries):
+        # Много правок (первый расчёт, смена скидки, вставка списка): строки считаются
+        # _radiator_lines и _bracket_contributions разом и дописываются в новые слоты
+        for key in changed:
+            self._slots.pop(key, None)
+        radiator_discount, bracket_discount, bracket_type = self._params
+        radiators, rad_types, kept = _radiator_lines({key: entries[key] for key in changed}, self._catalog, radiator_discount)
+        if radiators is None:
+            return
+        counts = np.zeros(len(radiators), dtype="int64")
+        if bracket_type != NO_BRACKETS:
+            contrib = _bracket_contributions(radiators, rad_types, self._catalog, bracket_discount, bracket_type)
+            if contrib is not None:
+                # Кронштейны уже идут по строкам, внутри строки — по порядку правил
+                counts = np.bincount(contrib["line"].to_numpy(), minlength=len(radiators))
+                self._contrib.extend([contrib[c].to_numpy() for c in ("art", "qty", "amount")])
+        # Кронштейны строки i занимают слоты с contrib_start + offsets[i]
+        contrib_start = self._contrib.size - int(counts.sum())
+        row_start = self._radiators.extend([radiators[c].to_numpy() for c in RADIATOR_COLUMNS])
+        offsets = np.cumsum(counts) - counts
+        self._slots.update(zip(
+            [changed[i] for i in kept.tolist()],
+            zip(range(row_start, row_start + len(radiators)), (contrib_start + offsets).tolist(), counts.tolist()),
+        ))
+
+    def result(self, entries, catalog, radiator_discount=0.0, bracket_discount=0.0, bracket_type=BRACKET_TYPES[0]):
+        # SpecResult для всех потребителей сессии: предпросмотр, итоги, выгрузка, страница
+        # «Спецификация». Повтор с теми же позициями и настройками — поиск по ключу, а последние
+        # SPEC_RESULTS вариантов (например, переключение скидки туда и обратно) не пересчитываются
+        if catalog is not self._results_catalog:
+            self._results.clear()
+            self._results_catalog = catalog
+        key = spec_key(entries, catalog.version, radiator_discount, bracket_discount, bracket_type)
+        found = self._results.get(key)
+        if found is not None:
+            self._results.move_to_end(key)
+            return found
+        mark_cache_miss("spec")
+        df = self.build(entries, catalog, radiator_discount, bracket_discount, bracket_type)
+        found = self._results[key] = SpecResult(key, df, None if df.empty else spec_totals(df, catalog))
+        while len(self._results) > SPEC_RESULTS:
+            self._results.popitem(last=False)
+        return found
+
+    def _line(self, key, raw):
+        # Строка одной ячейки и её кронштейны — те же проверки и округления, что в
+        # _radiator_lines и _bracket_contributions, только для одного значения
+        sheet, art = key
+        qty = parse_quantity(raw)
+        product = self._catalog.articles.get(art)
+        if qty <= 0 or product is None or product.sheet != sheet:
+            return None
+        disc_price = round(product.price * (1 - self._params[0] / 100), 2)
+        row = (
+            product.article, product.name, product.power, product.price, disc_price, qty,
+            round(disc_price * qty, 2), "VK" if "VK" in sheet else "K",
+            int(product.rad_type), int(product.height), int(product.length),
+        )
+        rules = self._rules.get((product.rad_type, product.height, product.length), ())
+        return row, [(b_art, k * qty, round(b_disc_price * (k * qty), 2)) for b_art, k, b_disc_price in rules]
+
+    def _collect(self, entries):
+        live = [slots for slots in map(self._slots.get, entries) if slots is not None]
+        if not live:
+            return pd.DataFrame([])
+        live = np.array(live, dtype=np.intp).reshape(-1, 3)
+        rows, starts, counts = live[:, 0], live[:, 1], live[:, 2]
+        # Слоты кронштейнов подряд по строкам в порядке ввода
+        offsets = np.cumsum(counts) - counts
+        index = np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+        if self._radiators.size > 2 * len(rows) + 1024:
+            # Освободившихся слотов стало больше, чем занятых: переложить строки подряд
+            self._radiators.compact(rows)
+            self._contrib.compact(index)
+            keys = [key for key in entries if key in self._slots]
+            self._slots = dict(zip(keys, zip(range(len(keys)), offsets.tolist(), counts.tolist())))
+            rows, index = np.arange(len(rows)), np.arange(len(index))
+
+        radiator_discount, bracket_discount, _ = self._params
+        article, name, power, price, disc_price, qty, amount, connection, rad_type, height, length = self._radiators.take(rows)
+        radiators = _radiator_frame(
+            article, name, power, price, radiator_discount, disc_price, qty, amount, connection, rad_type, height, length,
+        )
+        brackets = None
+        if len(index):
+            art, qty_b, amount_b = self._contrib.take(index)
+            brackets = _aggregate_brackets(pd.DataFrame({"art": art, "qty": qty_b, "amount": amount_b}), self._catalog, bracket_discount)
+        return _assemble(radiators, brackets)
+
+
+def _bracket_lookup(catalog, bracket_discount, bracket_type):
+    # (тип, высота, длина) -> [(Артикул, штук на радиатор, цена со скидкой)] в порядке правил
+    lookup = {}
+    if bracket_type == NO_BRACKETS:
+        return lookup
+    table = catalog.bracket_rules
+    table = table[table["mode"] == bracket_type].sort_values("seq", kind="stable")
+    for rad_type, height, length, art, k in zip(table["rad_type"], table["height"], table["length"], table["article"], table["k"]):
+        disc_price = round(catalog.brackets[art].price * (1 - bracket_discount / 100), 2)
+        lookup.setdefault((str(rad_type), int(height), int(length)), []).append((art, int(k), disc_price))
+    return lookup
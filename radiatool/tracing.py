@@ -0,0 +1,101 @@
+# radiatool/tracing.py
+# Замеры одного перезапуска страницы или фрагмента: время по фазам, попадания в кэш,
+# счётчики. Запись — строка JSON в файл трассировки и в журнал сессии для панели диагностики.
+# Выключенная трассировка — это NULL_TRACE, у которого все методы пустые
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+# Путь к файлу трассировки (JSON lines); если переменная задана, трассируются все сессии
+TRACE_ENV = "RADIATOOL_TRACE"
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def mark_cache_miss(name):
+    # Вызывается в теле кэшируемой функции: тело выполняется только при промахе кэша
+    misses = getattr(_local, "misses", None)
+    if misses is not None:
+        misses.add(name)
+
+
+class RunTrace:
+    def __init__(self, kind, session, path=None, log=None):
+        self.kind, self.session, self.path, self.log = kind, session, path, log
+        self.started = datetime.now().isoformat(timespec="milliseconds")
+        self._t0 = time.perf_counter()
+        self.phases, self.cache, self.counts = {}, {}, {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, value):
+        self.counts[name] = value
+
+    def cached(self, name, fn, *args, **kwargs):
+        _local.misses = set()
+        with self.phase(name):
+            result = fn(*args, **kwargs)
+        # Несколько вызовов за перезапуск: промах хотя бы одного — промах
+        if self.cache.get(name) != "miss":
+            self.cache[name] = "miss" if name in _local.misses else "hit"
+        return result
+
+    def finish(self):
+        if getattr(_local, "current", None) is self:
+            _local.current = None
+        record = {
+            "ts": self.started,
+            "session": self.session,
+            "kind": self.kind,
+            "total_ms": round((time.perf_counter() - self._t0) * 1000, 2),
+            "phases_ms": {name: round(s * 1000, 2) for name, s in self.phases.items()},
+            "cache": self.cache,
+            "counts": self.counts,
+        }
+        if self.log is not None:
+            self.log.append(record)
+        if self.path:
+            line = json.dumps(record, ensure_ascii=False)
+            with _write_lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        return record
+
+
+class NullTrace:
+    _null = nullcontext()
+
+    def phase(self, name):
+        return self._null
+
+    def count(self, name, value):
+        pass
+
+    def cached(self, name, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+    def finish(self):
+        return None
+
+
+NULL_TRACE = NullTrace()
+
+
+def start_trace(kind, session, enabled, path=None, log=None):
+    # Новый замер становится текущим для потока: фрагмент, вызванный внутри страницы,
+    # пишет в замер страницы, а отдельный перезапуск фрагмента заводит свой
+    trace = RunTrace(kind, session, path, log) if enabled else NULL_TRACE
+    _local.current = trace if enabled else None
+    return trace
+
+
+def current_trace():
+    return getattr(_local, "current", None)
@@ -0,0 +1,31 @@
+# tests/conftest.py
+# Общие фикстуры: каталог из data/ разбирается и собирается один раз на весь прогон
+from pathlib import Path
+
+import pytest
+
+from radiatool.brackets import read_bracket_rules
+from radiatool.catalog import build_catalog, load_catalog
+
+DATA = Path(__file__).resolve().parents[1] / "data"
+
+
+@pytest.fixture(scope="session")
+def data_dir():
+    return DATA
+
+
+@pytest.fixture(scope="session")
+def rules():
+    return read_bracket_rules(DATA / "bracket_rules.json")
+
+
+@pytest.fixture(scope="session")
+def catalog_files(tmp_path_factory):
+    # (листы, прайс кронштейнов) из xlsx; скомпилированный кэш — во временной папке
+    return load_catalog(DATA / "Матрица.xlsx", DATA / "Кронштейны.xlsx", tmp_path_factory.mktemp("catalog"))
+
+
+@pytest.fixture(scope="session")
+def catalog(catalog_files, rules):
+    return build_catalog(*catalog_files, rules)
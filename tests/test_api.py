@@ -0,0 +1,16 @@
+# tests/test_api.py
+import pytest
+
+from radiatool.api import MAX_BODY, QuoteError, body_length
+
+
+@pytest.mark.parametrize("header", [None, "", "abc", "-1", "1.5", "+5", "1_000", "１２", str(MAX_BODY + 1)])
+def test_bad_content_length_is_rejected(header):
+    with pytest.raises(QuoteError):
+        body_length(header)
+
+
+def test_content_length():
+    assert body_length("0") == 0
+    assert body_length(" 42 ") == 42
+    assert body_length(str(MAX_BODY)) == MAX_BODY
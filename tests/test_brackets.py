@@ -0,0 +1,43 @@
+# tests/test_brackets.py
+# Правила bracket_rules.json и скомпилированная таблица catalog.bracket_rules должны
+# совпадать с прежним if/elif-подбором кронштейнов для всех сочетаний
+import pytest
+from baseline import baseline_calculate_brackets
+
+from radiatool.brackets import match_bracket_rules
+
+MODES = ["Настенные кронштейны", "Напольные кронштейны", "Без кронштейнов"]
+TYPES = ["10", "11", "20", "21", "22", "30", "33", "99"]
+# Высоты каталога и вне его
+HEIGHTS = [300, 400, 500, 600, 900, 200, 350, 1000]
+# Границы диапазонов длин и значения за ними
+LENGTHS = [300, 399, 400, 500, 1000, 1050, 1100, 1600, 1650, 1700, 1800, 2000, 2001, 2100]
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("qty", [1, 3])
+def test_rules_match_baseline(rules, mode, qty):
+    for rad_type in TYPES:
+        for height in HEIGHTS:
+            for length in LENGTHS:
+                expected = baseline_calculate_brackets(rad_type, length, height, mode, qty)
+                assert match_bracket_rules(rules, rad_type, length, height, mode, qty) == expected, (rad_type, height, length)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_compiled_table_matches_baseline(catalog, mode):
+    table = catalog.bracket_rules
+    table = table[table["mode"] == mode].sort_values("seq", kind="stable")
+    compiled = {}
+    for rad_type, height, length, art, k in zip(table["rad_type"], table["height"], table["length"], table["article"], table["k"]):
+        compiled.setdefault((str(rad_type), int(height), int(length)), []).append((art, int(k)))
+
+    combos = catalog.products[["rad_type", "height", "length"]].dropna().drop_duplicates()
+    assert len(combos)
+    for rad_type, height, length in combos.itertuples(index=False):
+        key = (str(rad_type), int(height), int(length))
+        # В таблицу попадают только кронштейны из прайса
+        expected = [(art, k) for art, k in baseline_calculate_brackets(*key[:1], key[2], key[1], mode) if art in catalog.brackets]
+        assert compiled.pop(key, []) == expected, key
+    # Лишних сочетаний в таблице нет
+    assert not compiled
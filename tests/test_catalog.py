@@ -0,0 +1,17 @@
+# tests/test_catalog.py
+import pytest
+
+
+def test_shared_tables_are_read_only(catalog):
+    # Каталог общий для всех сессий: запись в его таблицы должна падать
+    first = catalog.products.index[0]
+    with pytest.raises(ValueError, match="read-only"):
+        catalog.products.loc[first, "price"] = 0.0
+    with pytest.raises(ValueError, match="read-only"):
+        catalog.products.loc[first, "sheet"] = catalog.products["sheet"].iloc[-1]
+    with pytest.raises(ValueError, match="read-only"):
+        catalog.bracket_rules.loc[0, "k"] = 99
+    # Выборки — обычные копии, их можно менять
+    subset = catalog.products.iloc[:3].copy()
+    subset["price"] = 0.0
+    assert catalog.products["price"].iloc[0] != 0.0
@@ -0,0 +1,28 @@
+# tests/test_foreign.py
+import io
+
+import pytest
+
+from radiatool.foreign import NOT_FOUND, SKIPPED_QTY, build_mapping_index, import_foreign_spec, read_mappings, resolve_name
+
+
+@pytest.fixture(scope="module")
+def index(catalog, data_dir):
+    return build_mapping_index(read_mappings(data_dir / "mappings.json"), catalog)
+
+
+def test_size_without_connection_needs_similar_name(index, catalog):
+    # Одного общего слова мало, чтобы взять подключение у записи из mappings.json
+    assert resolve_name("Радиатор 22/500/1000", index, catalog) is None
+    sheet, _, _, method = resolve_name("Радиатор VK 22/500/1000", index, catalog)
+    assert (sheet, method) == ("VK-правое 22", "по размеру")
+
+
+def test_bad_quantity_is_listed(index, catalog):
+    text = "Наименование;Кол-во\nРадиатор VK 22/500/1000;2 шт.\nРадиатор VK 22/500/1000;3\nРадиатор 22/500/1000;1\n"
+    entries, table = import_foreign_spec(io.BytesIO(text.encode()), "spec.csv", index, catalog)
+    assert list(entries.values()) == ["3"]
+    methods = table["Способ сопоставления"].tolist()
+    assert methods[0] == f"{SKIPPED_QTY} «2 шт.»"
+    assert methods[2] == NOT_FOUND
+    assert table["Кол-во"].tolist() == [0, 3, 1]
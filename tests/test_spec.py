@@ -0,0 +1,83 @@
+# tests/test_spec.py
+import random
+
+import pandas as pd
+import pytest
+from baseline import baseline_prepare_spec_data
+
+from radiatool.catalog import BRACKETS_SHEET
+from radiatool.spec import BRACKET_TYPES, SpecCache, build_spec
+
+# Строки количества как из матрицы, CSV и API: суммы, пробелы, дробные, неверные, числа
+QUANTITIES = ["1", "2+3", "+4+", "", "0", "2.5", "3.5", "abc", "10", " 3 ", "1+1+1", "-2", "1e1", 7, 2.5, None]
+# (на радиаторы, на кронштейны). 37.5, 15, 12.5 и 2.5 дают на ценах каталога «половинки»
+# копеек, где встроенный round и np.round расходятся
+DISCOUNTS = [(37.5, 15.0), (0.0, 0.0), (12.5, 37.5), (7.5, 12.345), (15.0, 2.5), (33.3, 99.9)]
+
+
+def random_entries(sheets, rnd, n):
+    keys = [(name, art) for name, df in sheets.items() if name != BRACKETS_SHEET for art in df["Артикул"]]
+    entries = {key: rnd.choice(QUANTITIES) for key in rnd.sample(keys, n)}
+    # Позиции, которые расчёт пропускает: артикул с чужого листа, неизвестные лист и артикул
+    (sheet, art), (other, _) = rnd.sample(keys, 2)
+    if other != sheet:
+        entries[(other, art)] = "2"
+    entries[("Нет такого листа", art)] = "1"
+    entries[(sheet, "0000000000")] = "1"
+    return entries
+
+
+@pytest.mark.parametrize("seed", range(12))
+@pytest.mark.parametrize("bracket_type", BRACKET_TYPES)
+def test_build_spec_matches_baseline(catalog_files, catalog, seed, bracket_type):
+    sheets, brackets_df = catalog_files
+    rnd = random.Random(seed)
+    entries = random_entries(sheets, rnd, rnd.choice([1, 5, 40, 300, 1500]))
+    radiator_discount, bracket_discount = DISCOUNTS[seed % len(DISCOUNTS)]
+    expected = baseline_prepare_spec_data(entries, sheets, brackets_df, radiator_discount, bracket_discount, bracket_type)
+    actual = build_spec(entries, catalog, radiator_discount, bracket_discount, bracket_type)
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+
+
+@pytest.mark.parametrize("bracket_type", BRACKET_TYPES)
+def test_article_from_other_sheet_is_skipped(catalog, bracket_type):
+    # Как в прежнем расчёте: артикул ищется только на листе позиции
+    own = catalog.grid_index["VK-правое 10"][(500, 1000)][0]
+    foreign = catalog.grid_index["K-боковое 22"][(500, 1000)][0]
+    assert build_spec({("VK-правое 10", foreign): "2"}, catalog, bracket_type=bracket_type).empty
+    expected = build_spec({("VK-правое 10", own): "2"}, catalog, bracket_type=bracket_type)
+    entries = {("VK-правое 10", own): "2", ("VK-правое 10", foreign): "2"}
+    assert build_spec(entries, catalog, bracket_type=bracket_type).equals(expected)
+    assert SpecCache().build(entries, catalog, bracket_type=bracket_type).equals(expected)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_spec_cache_matches_build_spec(catalog_files, catalog, seed):
+    # Правки по одной и всех ячеек сразу (больше BULK_LINES, до compact), удаления, возвраты,
+    # смена порядка ввода и настроек: пересчёт SpecCache совпадает с полным build_spec
+    sheets, _ = catalog_files
+    rnd = random.Random(seed)
+    cache = SpecCache()
+    entries = random_entries(sheets, rnd, 600)
+    params = (37.5, 15.0, BRACKET_TYPES[0])
+    for step in range(60):
+        keys = list(entries)
+        action = rnd.choice(["edit", "edit", "delete", "add", "reorder", "bulk", "params"])
+        if action == "edit":
+            for key in rnd.sample(keys, min(len(keys), rnd.randint(1, 5))):
+                entries[key] = rnd.choice(QUANTITIES)
+        elif action == "delete":
+            for key in rnd.sample(keys, min(len(keys), rnd.randint(1, 300))):
+                del entries[key]
+        elif action == "add":
+            entries.update(random_entries(sheets, rnd, rnd.choice([1, 20, 400])))
+        elif action == "reorder":
+            rnd.shuffle(keys)
+            entries = {key: entries[key] for key in keys}
+        elif action == "bulk":
+            for key in keys:
+                entries[key] = rnd.choice(QUANTITIES)
+        else:
+            params = (*rnd.choice(DISCOUNTS), rnd.choice(BRACKET_TYPES))
+        expected = build_spec(entries, catalog, *params)
+        pd.testing.assert_frame_equal(cache.build(entries, catalog, *params), expected, check_exact=True)